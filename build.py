@@ -0,0 +1,215 @@
+"""
+Rebuild only the report artifacts whose inputs changed.
+
+Every stage declares the script(s) it runs, the data files it reads and the
+files it writes; its scripts and the local modules they import (directly or
+through each other) are found by parsing the imports, so they are inputs too
+without being listed by hand. The content
+fingerprints of both are recorded in .build_state.json after a stage runs; a
+stage is rerun when an input fingerprint differs from the recorded one, when an
+output is missing or was changed by someone else, or when it never ran.
+
+Usage:
+    python build.py                 # bring every stage up to date
+    python build.py tables_2025     # one stage (plus the stages it depends on)
+    python build.py --plan          # show what would run, without running it
+    python build.py --force ...     # rerun the selected stages regardless
+"""
+import argparse
+import glob
+import json
+import os
+import subprocess
+import sys
+
+from fingerprint import file_fingerprint, local_modules
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+STATE_FILE = os.path.join(ROOT, '.build_state.json')
+
+
+def module_inputs(script):
+    """The script and every local module it imports, directly or through other local modules (root-relative)"""
+    return [os.path.relpath(path, ROOT) for path in local_modules(os.path.join(ROOT, script), ROOT)]
+
+
+class Stage:
+    def __init__(self, name, scripts, cwd, inputs, outputs):
+        self.name = name
+        self.scripts = scripts   # run in order, relative to cwd
+        self.cwd = cwd
+        # Data files (relative to the repository root), then the scripts and the modules they import
+        modules = sorted({path for script in scripts for path in module_inputs(os.path.join(cwd, script))})
+        self.inputs = inputs + [path for path in modules if path not in inputs]
+        self.outputs = outputs   # paths or glob patterns relative to the repository root
+
+
+def _charts(directory, names):
+    return [f'{directory}/{name}.png' for name in names]
+
+
+# Stages are listed in dependency order
+STAGES = [
+    # 2024 report (repository root)
+    Stage('tables_2024', ['create_impact_tables.py'], '.',
+          inputs=['operated_eye_va_data_fixed.csv'],
+          outputs=[f'tables/{name}.csv' for name in
+                   ['vision_impact', 'vision_categories', 'procedure_success', 'diagnosis_success',
+                    'gender_success', 'age_success', 'location_success']]),
+    Stage('charts_2024', ['analyze_eye_camp_data.py'], '.',
+          inputs=['operated_eye_va_data.csv'],
+          outputs=_charts('visualizations', [
+              'gender_distribution', 'age_distribution', 'age_categories', 'location_distribution',
+              'diagnosis_distribution', 'procedure_distribution', 'eye_distribution',
+              'va_distribution_by_timepoint', 'va_progression_percentage', 'improvement_categories',
+              'improvement_by_diagnosis', 'improvement_by_age', 'improvement_by_gender',
+              'success_rate_by_diagnosis', 'success_rate_by_age', 'success_rate_by_gender',
+              'va_transition_heatmap', 'before_after_va_cataract'])),
+    Stage('journey_2024', ['create_va_journey_chart.py'], '.',
+          inputs=['operated_eye_va_data.csv'],
+          outputs=_charts('visualizations', ['va_journey_cataract', 'va_distribution_area_chart',
+                                             'va_flow_cataract', 'va_flow_cataract_*'])),
+    Stage('ordered_va_2024', ['create_ordered_va_chart.py'], '.',
+          inputs=['operated_eye_va_data.csv'],
+          outputs=_charts('visualizations', ['before_after_va_cataract_ordered'])),
+
+    # 2025 report (new/)
+    Stage('tables_2025', ['create_tables.py'], 'new',
+          inputs=['new/operated_eye_va_data.csv'],
+          outputs=[f'new/tables/{name}.csv' for name in
+                   ['vision_impact', 'location_success', 'procedure_success', 'age_success', 'gender_success']]),
+    Stage('charts_2025', ['analyze_eye_camps.py'], 'new',
+          inputs=['new/operated_eye_va_data.csv'],
+          outputs=_charts('new/visualizations', [
+              'gender_distribution', 'age_distribution', 'age_categories', 'location_distribution',
+              'procedure_distribution', 'eye_distribution', 'improvement_categories'])),
+    # Runs after charts_2025, whose two-timepoint va_distribution_by_timepoint.png it replaces
+    Stage('journey_2025', ['create_correct_visuals.py'], 'new',
+          inputs=['new/operated_eye_va_data.csv'],
+          outputs=_charts('new/visualizations', [
+              'va_distribution_area_chart', 'va_distribution_by_timepoint', 'va_journey_cataract',
+              'va_journey_cataract_*', 'va_flow_cataract', 'va_flow_cataract_*'])),
+    Stage('report_2025', ['complete_md_update.py'], 'new',
+          inputs=['new/operated_eye_va_data.csv',
+                  'new/tables/vision_impact.csv', 'new/tables/location_success.csv',
+                  'new/tables/procedure_success.csv', 'new/tables/gender_success.csv',
+                  'new/tables/age_success.csv'],
+          outputs=['new/new.md']),
+]
+STAGES_BY_NAME = {stage.name: stage for stage in STAGES}
+
+
+def fingerprint_paths(patterns):
+    """Fingerprint every file matched by the given paths/patterns; missing files map to None"""
+    prints = {}
+    for pattern in patterns:
+        matches = sorted(glob.glob(os.path.join(ROOT, pattern)))
+        if not matches and not glob.has_magic(pattern):
+            prints[pattern] = None
+        for path in matches:
+            prints[os.path.relpath(path, ROOT)] = file_fingerprint(path)
+    return prints
+
+
+def load_state():
+    if os.path.exists(STATE_FILE):
+        with open(STATE_FILE) as f:
+            return json.load(f)
+    return {}
+
+
+def save_state(state):
+    with open(STATE_FILE, 'w') as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+
+
+def dependencies(stage):
+    """Earlier stages that write one of this stage's inputs"""
+    deps = []
+    for other in STAGES[:STAGES.index(stage)]:
+        written = set(fingerprint_paths(other.outputs)) | set(other.outputs)
+        if written & set(stage.inputs):
+            deps.append(other)
+    return deps
+
+
+def select(targets):
+    """The requested stages plus everything upstream of them, in dependency order"""
+    if not targets:
+        return list(STAGES)
+    selected = set()
+    pending = [STAGES_BY_NAME[name] for name in targets]
+    while pending:
+        stage = pending.pop()
+        if stage.name not in selected:
+            selected.add(stage.name)
+            pending.extend(dependencies(stage))
+    return [stage for stage in STAGES if stage.name in selected]
+
+
+def stale_reason(stage, state):
+    """Why the stage has to run, or None when it is up to date"""
+    record = state.get(stage.name)
+    if record is None:
+        return 'never built'
+    inputs = fingerprint_paths(stage.inputs)
+    changed = [path for path, digest in inputs.items() if record['inputs'].get(path) != digest]
+    if changed:
+        return 'inputs changed: ' + ', '.join(changed)
+    outputs = fingerprint_paths(stage.outputs)
+    if any(digest is None for digest in outputs.values()):
+        return 'outputs missing'
+    if outputs != record['outputs']:
+        return 'outputs modified outside the build'
+    return None
+
+
+def run_stage(stage):
+    env = dict(os.environ, MPLBACKEND='Agg')
+    for script in stage.scripts:
+        print(f"[{stage.name}] python {os.path.join(stage.cwd, script)}")
+        subprocess.run([sys.executable, script], cwd=os.path.join(ROOT, stage.cwd), env=env, check=True)
+
+
+def build(targets=(), plan=False, force=False):
+    state = load_state()
+    will_run = set()
+
+    for stage in select(targets):
+        reason = 'forced' if force else stale_reason(stage, state)
+        upstream = [dep.name for dep in dependencies(stage) if dep.name in will_run]
+        if reason is None and plan and upstream:
+            # In a dry run upstream stages have not rewritten their outputs yet
+            reason = 'upstream will rebuild: ' + ', '.join(upstream)
+
+        if reason is None:
+            print(f"[{stage.name}] up to date")
+            continue
+
+        will_run.add(stage.name)
+        if plan:
+            print(f"[{stage.name}] would run ({reason})")
+            continue
+
+        print(f"[{stage.name}] running ({reason})")
+        run_stage(stage)
+        state[stage.name] = {'inputs': fingerprint_paths(stage.inputs),
+                             'outputs': fingerprint_paths(stage.outputs)}
+        save_state(state)
+
+    if not will_run:
+        print("Everything is up to date.")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Rebuild the report artifacts whose inputs changed')
+    parser.add_argument('targets', nargs='*', metavar='stage',
+                        help='stages to build (default: all) - ' + ', '.join(STAGES_BY_NAME))
+    parser.add_argument('--plan', action='store_true', help='only show which stages would run and why')
+    parser.add_argument('--force', action='store_true', help='rerun the selected stages even if up to date')
+    args = parser.parse_args()
+    unknown = [name for name in args.targets if name not in STAGES_BY_NAME]
+    if unknown:
+        parser.error('unknown stage(s): ' + ', '.join(unknown))
+
+    build(args.targets, plan=args.plan, force=args.force)
@@ -0,0 +1,198 @@
+"""
+Single-pass cleaning of the surgery datasets.
+
+The cleaning steps that used to be separate read-modify-write scripts
+(fix_eye_data.py, standardize_gender_data.py, impute_age_data.py,
+new/standardize_masasi_data.py, ...) are Rules here: a column, a
+description and a vectorised function from the column to its cleaned
+version. A rule set is an ordered list of rules; clean_csv() reads the file
+once, applies every rule in order to the same frame and writes it back once,
+so adding rules does not add I/O.
+
+Usage:
+    python cleaning.py registry-2025            # clean new/operated_eye_va_data.csv
+    python cleaning.py combined-2024 --dry-run  # report what would change, without saving
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+import cohort
+import imputation
+import va_normalise
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Standardisation rules for the 2025 camp data (as in new/standardize_masasi_data.py);
+# VA typos are handled by the va_normalise rules
+SEX_MAPPING = {'M': 'Male', 'F': 'Female'}
+AGE_FIXES = {'17D': '17'}
+PROCEDURE_MAPPING = {
+    ' SICS': 'SICS',
+    'SURGERY': 'SICS',
+    'LID CYST EXCISION': 'CYST EXCISION',
+    'FOREIGN BODY': 'FB',
+}
+
+# Placeholders that mean "not recorded"
+BLANKS = {'': np.nan, '.': np.nan, 'nan': np.nan, 'NaN': np.nan}
+
+
+class Rule:
+    """One cleaning step: apply(column, df) returns the cleaned column; imputes marks rules that fill gaps"""
+
+    def __init__(self, column, description, apply, imputes=False):
+        self.column = column
+        self.description = description
+        self.apply = apply
+        self.imputes = imputes
+
+    def __repr__(self):
+        return f'Rule({self.column!r}, {self.description!r})'
+
+
+def strip(column):
+    """Remove surrounding whitespace from the text cells"""
+    return Rule(column, 'strip whitespace',
+                lambda s, df: s.str.strip() if s.dtype == object else s)
+
+
+def replace(column, mapping, description=None):
+    return Rule(column, description or 'replace spellings', lambda s, df: s.replace(mapping))
+
+
+def blanks_to_missing(column):
+    return replace(column, BLANKS, 'blank placeholders to missing')
+
+
+def to_numeric(column):
+    return Rule(column, 'convert to numbers', lambda s, df: pd.to_numeric(s, errors='coerce'))
+
+
+def round_to_int(column):
+    """Round to whole numbers; only valid once the column has no missing values"""
+    return Rule(column, 'round to whole numbers', lambda s, df: s.round().astype(int))
+
+
+def _imputation_rule(imp, description):
+    by = f' by {", ".join(imp.by)}' if imp.by else ''
+    return Rule(imp.column, description + by, imp.fill, imputes=True)
+
+
+def fill_mode(column, by=()):
+    """Fill missing cells with the most common value (of their group)"""
+    return _imputation_rule(imputation.Imputation(column, 'mode', by), 'fill missing with the most common value')
+
+
+def fill_group_median(column, by):
+    """Fill missing cells with the median of their group, then with the overall median"""
+    return _imputation_rule(imputation.Imputation(column, 'median', by), 'fill missing with the median')
+
+
+def fill_value(column, value):
+    return Rule(column, f'fill missing with {value}', lambda s, df: s.fillna(value), imputes=True)
+
+
+def normalise_va(column):
+    """Normalise VA spellings with the va_normalise rules; spellings it does not recognise are listed"""
+    def apply(s, df):
+        normalised, unmapped = va_normalise.normalise(s)
+        if len(unmapped):
+            print(f"  {column}: unmapped VA spellings " + ', '.join(f'{k!r} ({n})' for k, n in unmapped.items()))
+        return normalised
+    return Rule(column, 'normalise VA spellings', apply)
+
+
+def alternate(column, values, by=()):
+    """Fill the missing cells with the values in turn (RE, LE, RE, ...) so the split stays even"""
+    return _imputation_rule(imputation.Imputation(column, 'alternate', by, values),
+                            'fill missing alternating ' + '/'.join(values))
+
+
+# Rule sets, each replacing one of the old fix scripts
+EYE_RULES = [strip('EYE'), blanks_to_missing('EYE'), fill_mode('EYE')]    # fix_eye_data.py, new/fix_local_eye_data.py
+GENDER_RULES = [strip('SEX'), blanks_to_missing('SEX'), replace('SEX', SEX_MAPPING, 'M/F to Male/Female'),
+                fill_mode('SEX')]                                           # standardize_gender_data.py
+AGE_RULES = [to_numeric('AGE'), fill_group_median('AGE', 'SEX'), round_to_int('AGE')]   # impute_age_data.py
+SEX_LABEL_RULES = [replace('SEX', SEX_MAPPING, 'M/F to Male/Female')]      # fix_gender_data.py
+EYE_TO_LE_RULES = [strip('EYE'), blanks_to_missing('EYE'), fill_value('EYE', 'LE')]   # new/fix_eye_to_le.py
+
+# New camp data (new/standardize_masasi_data.py, new/final_data_cleanup.py and ingest_camp.py); missing
+# eyes alternate RE/LE within each camp, as when each camp was cleaned on its own
+CAMP_RULES = ([strip('SEX'), replace('SEX', SEX_MAPPING, 'M/F to Male/Female'),
+               replace('AGE', AGE_FIXES, 'fix age typos'), to_numeric('AGE'),
+               replace('CONFIRMED PROCEDURE', PROCEDURE_MAPPING, 'standardise procedure names')] +
+              [normalise_va(col) for col in cohort.VA_COLUMNS] +
+              [strip('EYE'), alternate('EYE', ['RE', 'LE'], by=('PHYSICAL ADDRSS',))])
+
+# Datasets and the rules that keep them clean; gender is standardised before it is used to impute ages
+DATASETS = {
+    'combined-2024': ('Combined_Eye_Surgery_Dataset.csv', EYE_RULES + GENDER_RULES + AGE_RULES),
+    'registry-2024': ('operated_eye_va_data.csv', SEX_LABEL_RULES),
+    'registry-2025': (os.path.join('new', 'operated_eye_va_data.csv'), CAMP_RULES),
+}
+
+
+def _changed(before, after):
+    """Number of cells a rule changed (missing stays missing, '64' -> 64 is not a change)"""
+    same = (before.isna() & after.isna()) | (before == after)
+    if before.dtype == object and after.dtype != object:
+        same |= pd.to_numeric(before, errors='coerce') == after
+    return int((~same).sum())
+
+
+def clean_frame(df, rules, audit_column=None):
+    """
+    Apply the rules in order to a copy of df; return it and the cells each rule changed.
+
+    With audit_column, that column lists the columns imputed in each row (see imputation.impute).
+    """
+    df = df.copy()
+    if audit_column is not None and audit_column not in df.columns:
+        df[audit_column] = ''
+    report = []
+    for rule in rules:
+        if rule.column not in df.columns:
+            continue
+        before = df[rule.column]
+        df[rule.column] = rule.apply(before, df)
+        report.append((rule, _changed(before, df[rule.column])))
+        if rule.imputes and audit_column is not None:
+            imputation.mark_imputed(df, before.isna() & df[rule.column].notna(), rule.column, audit_column)
+    return df, report
+
+
+def print_report(report):
+    for rule, changed in report:
+        if changed:
+            print(f"  {rule.column}: {rule.description} - {changed} values changed")
+    if not any(changed for _, changed in report):
+        print("  Nothing to change")
+
+
+def clean_csv(path, rules, dry_run=False, audit_column=None):
+    """Clean a CSV in one read and (if anything changed) one write; return the cleaned frame"""
+    df, report = clean_frame(pd.read_csv(path), rules, audit_column)
+    print(f"Cleaning {path} ({len(df)} records, {len(rules)} rules)")
+    print_report(report)
+    if any(changed for _, changed in report) and not dry_run:
+        df.to_csv(path, index=False)
+        print(f"Saved {path}")
+    return df
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Apply the cleaning rules to a dataset in a single pass')
+    parser.add_argument('datasets', nargs='+', choices=list(DATASETS), metavar='dataset',
+                        help='one or more of: ' + ', '.join(DATASETS))
+    parser.add_argument('--dry-run', action='store_true', help='report the changes without saving them')
+    parser.add_argument('--audit', nargs='?', const=imputation.AUDIT_COLUMN, metavar='COLUMN',
+                        help=f'record the imputed columns of each row in an audit column '
+                             f'(default name: {imputation.AUDIT_COLUMN})')
+    args = parser.parse_args()
+
+    for name in args.datasets:
+        path, rules = DATASETS[name]
+        clean_csv(os.path.join(ROOT, path), rules, dry_run=args.dry_run, audit_column=args.audit)
@@ -0,0 +1,155 @@
+import glob
+import math
+import os
+
+import numpy as np
+import pandas as pd
+
+import va_codec
+from fingerprint import file_fingerprint
+
+# Column names shared by the 2024 (root) and 2025 (new/) datasets
+VA_COLUMNS = ['PRE_OP_VA', '1_DAY_POST_OP_VA', '2_WEEKS_POST_OP_VA', '1_MONTH_POST_OP_VA']
+LOCATION_COLUMNS = ['PHYSICAL ADDRSS', 'PATIENTS PHYSICAL ADDRSS ']
+PROCEDURE_COLUMN = 'CONFIRMED PROCEDURE'
+DIAGNOSIS_COLUMN = 'DIAGNOSIS'
+
+# Fixed vocabularies - anything outside them is stored as missing
+SEX_CATEGORIES = ['Female', 'Male']
+EYE_CATEGORIES = ['LE', 'RE']
+AGE_GROUPS = ['0-14', '15-49', '50-59', '60-69', '70-79', '80+']
+AGE_BINS = [-np.inf, 15, 50, 60, 70, 80, np.inf]
+
+# WHO vision categories as ranges of fine-scale codes
+VISION_CATEGORIES = ['Blind/Severe Visual Impairment', 'Moderate Visual Impairment',
+                     'Mild Visual Impairment', 'Normal/Near Normal']
+VISION_CATEGORY_BINS = [-0.5, va_codec.code('CF6M') + 0.5, va_codec.code('6/36') + 0.5,
+                        va_codec.code('6/18') + 0.5, len(va_codec.FINE_SCALE) - 0.5]
+
+# Functional vision is 6/18 or better
+FUNCTIONAL_CODE = va_codec.code('6/18')
+
+
+def location_column(df):
+    """Return the name of the location column used by this dataset"""
+    for col in LOCATION_COLUMNS:
+        if col in df.columns:
+            return col
+    raise KeyError(f"No location column found, expected one of {LOCATION_COLUMNS}")
+
+
+def encode_cohort(df):
+    """
+    Convert a raw surgery dataframe into the compact cohort representation.
+
+    SEX, EYE and the VA columns become categoricals over fixed vocabularies
+    (the VA columns are ordered on the fine scale, so their codes are the VA
+    codes), the free-text columns become categoricals over their observed
+    values, AGE becomes float32 and an Age_Group categorical is added.
+    """
+    df = df.copy()
+
+    if 'SN' in df.columns:
+        df['SN'] = pd.to_numeric(df['SN'], downcast='integer')
+
+    if 'SEX' in df.columns:
+        sex = df['SEX'].astype('string').str.strip().replace({'M': 'Male', 'F': 'Female'})
+        df['SEX'] = pd.Categorical(sex, categories=SEX_CATEGORIES)
+
+    if 'EYE' in df.columns:
+        df['EYE'] = pd.Categorical(df['EYE'].astype('string').str.strip(), categories=EYE_CATEGORIES)
+
+    if 'AGE' in df.columns:
+        df['AGE'] = pd.to_numeric(df['AGE'], errors='coerce').astype('float32')
+        df['Age_Group'] = pd.cut(df['AGE'], bins=AGE_BINS, labels=AGE_GROUPS, right=False)
+
+    for col in [PROCEDURE_COLUMN, DIAGNOSIS_COLUMN] + LOCATION_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+
+    for col in VA_COLUMNS:
+        if col in df.columns:
+            codes = va_codec.encode(df[col], 'fine')
+            df[col] = pd.Categorical.from_codes(np.where(codes < 0, -1, codes),
+                                                categories=va_codec.FINE_SCALE, ordered=True)
+
+    return df
+
+
+def cache_path(path, fingerprint):
+    """Columnar cache file kept next to the CSV, e.g. operated_eye_va_data.cohort-<hash>.parquet"""
+    root, _ = os.path.splitext(path)
+    return f'{root}.cohort-{fingerprint}.parquet'
+
+
+def _parquet_available():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _write_cache(path, cached):
+    # Drop caches built from older versions of the CSV before writing the new one
+    root, _ = os.path.splitext(path)
+    for stale in glob.glob(f'{glob.escape(root)}.cohort-*.parquet'):
+        os.remove(stale)
+
+    df = encode_cohort(pd.read_csv(path))
+    tmp = cached + '.tmp'
+    df.to_parquet(tmp, index=False)
+    os.replace(tmp, cached)
+
+
+def load_cohort(path='operated_eye_va_data.csv', columns=None, cache=True):
+    """
+    Return the encoded cohort frame for a surgery CSV, optionally only some columns.
+
+    With cache=True the encoded frame is written once to a Parquet file next to
+    the CSV, keyed by the CSV's content hash, and later calls read just the
+    requested columns from it. Editing the CSV changes the hash, so the next
+    load rebuilds the cache. Without pyarrow the CSV is parsed every time.
+    """
+    if cache and _parquet_available():
+        cached = cache_path(path, file_fingerprint(path))
+        if not os.path.exists(cached):
+            _write_cache(path, cached)
+        return pd.read_parquet(cached, columns=columns)
+
+    df = encode_cohort(pd.read_csv(path))
+    return df if columns is None else df[columns]
+
+
+def is_cataract_surgery(df):
+    """Boolean mask of SICS (cataract) procedures, excluding eviscerations"""
+    procedure = df[PROCEDURE_COLUMN]
+    categories = procedure.cat.categories
+    is_cataract = categories.str.contains('SICS', case=False) & (categories != 'EVISCERATION')
+    # Missing procedures (code -1) pick up the trailing False
+    return pd.Series(np.append(is_cataract, False)[procedure.cat.codes], index=df.index)
+
+
+def functional(va):
+    """1.0 where an encoded VA column is 6/18 or better, 0.0 where worse, NaN where missing"""
+    codes = va.cat.codes.to_numpy()
+    return pd.Series(np.where(codes < 0, np.nan, codes >= FUNCTIONAL_CODE), index=va.index, dtype=float)
+
+
+def vision_category(va):
+    """WHO vision category of an encoded VA column"""
+    codes = va.cat.codes.astype(float).where(va.cat.codes >= 0)
+    return pd.cut(codes, bins=VISION_CATEGORY_BINS, labels=VISION_CATEGORIES)
+
+
+def check_key_space(radices):
+    """
+    Raise ValueError if one int64 key cannot hold a digit per column.
+
+    radices maps each packed column to its number of digit values (categories
+    + 1 for missing); past 2**63 keys would wrap and merge unrelated groups.
+    """
+    size = math.prod(radices.values())
+    if size >= 2 ** 63:
+        raise ValueError(f"Too many distinct values to pack into one int64 key ({size} combinations): "
+                         + ', '.join(f'{col} {radix}' for col, radix in radices.items()))
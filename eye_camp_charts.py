@@ -0,0 +1,242 @@
+"""
+Charts drawn by analyze_eye_camp_data.py.
+
+Each function draws one chart on the current figure; rendering creates, saves
+and closes it. Only imported when charts are requested, so the statistics run
+without loading matplotlib and seaborn.
+"""
+import numpy as np
+import matplotlib.pyplot as plt
+import seaborn as sns
+
+import rendering
+
+
+def draw_gender_distribution(df):
+    ax = sns.countplot(x='SEX', data=df, palette='viridis')
+    plt.title('Gender Distribution of Patients', fontsize=16, fontweight='bold')
+    plt.xlabel('Gender', fontsize=14)
+    plt.ylabel('Number of Patients', fontsize=14)
+
+    # Add count labels on bars
+    for p in ax.patches:
+        ax.annotate(f'{int(p.get_height())}',
+                    (p.get_x() + p.get_width()/2., p.get_height()),
+                    ha='center', va='bottom', fontsize=12)
+
+    plt.tight_layout()
+
+
+def draw_age_distribution(df):
+    sns.histplot(data=df, x='AGE', bins=20, kde=True)
+    plt.title('Age Distribution of Patients', fontsize=16, fontweight='bold')
+    plt.xlabel('Age (Years)', fontsize=14)
+    plt.ylabel('Number of Patients', fontsize=14)
+    plt.axvline(df['AGE'].median(), color='red', linestyle='--', label=f'Median Age: {df["AGE"].median():.1f}')
+    plt.legend()
+    plt.tight_layout()
+
+
+def draw_age_categories(df, order):
+    ax = sns.countplot(x='Age_Category', data=df, order=order, palette='viridis')
+    plt.title('Age Categories of Patients', fontsize=16, fontweight='bold')
+    plt.xlabel('Age Category', fontsize=14)
+    plt.ylabel('Number of Patients', fontsize=14)
+
+    # Add count and percentage labels on bars
+    total = len(df)
+    for p in ax.patches:
+        height = p.get_height()
+        ax.annotate(f'{int(height)}\n({height/total:.1%})',
+                    (p.get_x() + p.get_width()/2., height),
+                    ha='center', va='bottom', fontsize=12)
+
+    plt.tight_layout()
+
+
+def draw_location_distribution(df):
+    ax = sns.countplot(y='PATIENTS PHYSICAL ADDRSS ', data=df,
+                      order=df['PATIENTS PHYSICAL ADDRSS '].value_counts().index[:10],
+                      palette='viridis')
+    plt.title('Top 10 Patient Locations', fontsize=16, fontweight='bold')
+    plt.xlabel('Number of Patients', fontsize=14)
+    plt.ylabel('Location', fontsize=14)
+
+    # Add count labels on bars
+    for p in ax.patches:
+        ax.annotate(f'{int(p.get_width())}',
+                    (p.get_width(), p.get_y() + p.get_height()/2),
+                    ha='left', va='center', fontsize=12)
+
+    plt.tight_layout()
+
+
+def draw_diagnosis_distribution(df):
+    # Filter out EVECERATION for the visualization only
+    diagnosis_df = df[df['DIAGNOSIS'] != 'EVECERATION'].copy()
+
+    ax = sns.countplot(y='DIAGNOSIS', data=diagnosis_df,
+                      order=diagnosis_df['DIAGNOSIS'].value_counts().index,
+                      palette='viridis')
+    plt.title('Diagnosis Distribution', fontsize=16)
+    plt.xlabel('Number of Patients', fontsize=14)
+    plt.ylabel('Diagnosis', fontsize=14)
+
+    # Add count and percentage labels
+    total = len(diagnosis_df)
+    for p in ax.patches:
+        width = p.get_width()
+        percentage = 100 * width / total
+        ax.text(width + 5,
+                p.get_y() + p.get_height()/2,
+                f'{int(width)} ({percentage:.1f}%)',
+                va="center", fontsize=12)
+
+
+def draw_procedure_distribution(df):
+    ax = sns.countplot(y='CONFIRMED PROCEDURE', data=df,
+                      order=df['CONFIRMED PROCEDURE'].value_counts().index,
+                      palette='viridis')
+    plt.title('Procedure Distribution', fontsize=16, fontweight='bold')
+    plt.xlabel('Number of Patients', fontsize=14)
+    plt.ylabel('Procedure', fontsize=14)
+
+    # Add count and percentage labels on bars
+    total = len(df)
+    for p in ax.patches:
+        width = p.get_width()
+        ax.annotate(f'{int(width)} ({width/total:.1%})',
+                    (width, p.get_y() + p.get_height()/2),
+                    ha='left', va='center', fontsize=12)
+
+    plt.tight_layout()
+
+
+def draw_eye_distribution(df):
+    ax = sns.countplot(x='EYE', data=df, palette='viridis')
+    plt.title('Eye Distribution', fontsize=16, fontweight='bold')
+    plt.xlabel('Eye', fontsize=14)
+    plt.ylabel('Number of Patients', fontsize=14)
+
+    # Add count and percentage labels on bars
+    total = len(df)
+    for p in ax.patches:
+        height = p.get_height()
+        ax.annotate(f'{int(height)}\n({height/total:.1%})',
+                    (p.get_x() + p.get_width()/2., height),
+                    ha='center', va='bottom', fontsize=12)
+
+    plt.tight_layout()
+
+
+def draw_va_distribution_by_timepoint(df, va_values):
+
+    # Create subplots for before and after
+    plt.subplot(1, 2, 1)
+    preop_counts = df['PRE_OP_VA'].value_counts()
+    preop_counts = preop_counts.reindex(va_values)
+    preop_counts = preop_counts.dropna()
+    plt.barh(preop_counts.index, preop_counts.values, color='darkred')
+    plt.title('Pre-Op Visual Acuity', fontsize=16)
+    plt.xlabel('Number of Patients', fontsize=14)
+    plt.ylabel('Visual Acuity', fontsize=14)
+
+    plt.subplot(1, 2, 2)
+    postop_counts = df['1_MONTH_POST_OP_VA'].value_counts()
+    postop_counts = postop_counts.reindex(va_values)
+    postop_counts = postop_counts.dropna()
+    plt.barh(postop_counts.index, postop_counts.values, color='darkgreen')
+    plt.title('1-Month Post-Op Visual Acuity', fontsize=16)
+    plt.xlabel('Number of Patients', fontsize=14)
+
+    plt.tight_layout()
+
+
+def draw_va_progression(va_progression_pct):
+    # Plot stacked percentage bar chart
+    va_progression_pct.T.plot(kind='bar', stacked=True, ax=plt.gca(),
+                             colormap='viridis')
+    plt.title('Visual Acuity Progression Over Time', fontsize=16, fontweight='bold')
+    plt.xlabel('Time Point', fontsize=14)
+    plt.ylabel('Percentage of Patients', fontsize=14)
+    plt.xticks(rotation=45)
+    plt.legend(title='Visual Acuity', bbox_to_anchor=(1.05, 1), loc='upper left')
+    plt.grid(False)
+    plt.tight_layout()
+
+
+def draw_improvement_categories(improvement_df, order):
+    ax = sns.countplot(x='Improvement_Category', data=improvement_df,
+                      order=order,
+                      palette='viridis')
+    plt.title('Visual Acuity Improvement Categories', fontsize=16, fontweight='bold')
+    plt.xlabel('Improvement Category', fontsize=14)
+    plt.ylabel('Number of Patients', fontsize=14)
+
+    # Add count and percentage labels on bars
+    total = len(improvement_df)
+    for p in ax.patches:
+        height = p.get_height()
+        ax.annotate(f'{int(height)}\n({height/total:.1%})',
+                    (p.get_x() + p.get_width()/2., height),
+                    ha='center', va='bottom', fontsize=12)
+
+    # Add note about special cases if needed
+    plt.annotate(f'Note: Special cases such as evisceration procedures\nwere appropriately excluded from this analysis.',
+                xy=(0.02, 0.02),
+                xycoords='axes fraction',
+                bbox=dict(boxstyle="round,pad=0.3", fc="yellow", alpha=0.3),
+                fontsize=10)
+
+    plt.tight_layout()
+
+
+def draw_improvement_boxplot(improvement_df, x, order, title, xlabel, rotate_xticks=False):
+    sns.boxplot(x=x, y='Improvement', data=improvement_df,
+               order=order, palette='viridis')
+    plt.title(title, fontsize=16, fontweight='bold')
+    plt.xlabel(xlabel, fontsize=14)
+    plt.ylabel('Improvement (Numeric Scale)', fontsize=14)
+    if rotate_xticks:
+        plt.xticks(rotation=45)
+    plt.tight_layout()
+
+
+def draw_success_rate(rates, title, xlabel):
+    rendering.draw_rate_bars(rates.index, rates['rate'], ci=(rates['ci_low'], rates['ci_high']))
+    ax = plt.gca()
+    plt.title(title, fontsize=16, fontweight='bold')
+    plt.xlabel(xlabel, fontsize=14)
+    plt.ylabel('Success Rate (%)', fontsize=14)
+    plt.ylim(0, 100)
+
+    # Add count and percentage labels on bars
+    for p in ax.patches:
+        height = p.get_height()
+        if np.isfinite(height):
+            ax.annotate(f'{height:.1f}%',
+                        (p.get_x() + p.get_width()/2., height),
+                        ha='center', va='bottom', fontsize=12)
+
+    plt.tight_layout()
+
+
+def draw_transition_heatmap(transition_matrix):
+    sns.heatmap(transition_matrix, annot=True, fmt='.1f', cmap='viridis', linewidths=0.5)
+    plt.title('Visual Acuity Transition: Pre-Op to 1-Month Post-Op for Cataract Patients',
+              fontsize=16, fontweight='bold')
+    plt.xlabel('1-Month Post-Op Visual Acuity', fontsize=14)
+    plt.ylabel('Pre-Op Visual Acuity', fontsize=14)
+    plt.tight_layout()
+
+
+def draw_before_after(before_after_df):
+    before_after_df.plot(kind='bar', ax=plt.gca())
+    plt.title('Visual Acuity Before and After Surgery for Cataract Patients',
+              fontsize=16, fontweight='bold')
+    plt.xlabel('Visual Acuity', fontsize=14)
+    plt.ylabel('Percentage of Patients', fontsize=14)
+    plt.xticks(rotation=45, ha='right')
+    plt.legend(title='Time Point')
+    plt.grid(axis='y')
+    plt.tight_layout()
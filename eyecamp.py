@@ -0,0 +1,213 @@
+"""
+One command line for the 2024 (root) and 2025 (new/) eye camp reports.
+
+Each stage is a command; several can be given at once and always run in the
+order clean, tables, charts, report, stats. Within one invocation every CSV
+is parsed once and the raw and encoded (cohort) frames are shared by all the
+requested stages, instead of each script re-reading the data.
+
+Usage:
+    python eyecamp.py stats                        # headline statistics for both years
+    python eyecamp.py tables charts --year 2025    # one year only
+    python eyecamp.py clean tables charts report stats --profile web
+
+Commands:
+    clean   apply the cleaning rules (cleaning.py) to the datasets in one pass and save them if anything changed
+    tables  write the outcome tables (tables/, new/tables/)
+    charts  render the charts (visualizations/, new/visualizations/)
+    report  regenerate new/new.md from the 2025 tables (the 2024 report is updated by hand
+            with update_index_with_tables.py, which is not safe to rerun)
+    stats   print the analysis statistics and test whether success differs between the groups of the tables
+"""
+import argparse
+import os
+import sys
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+NEW = os.path.join(ROOT, 'new')
+
+# The 2025 scripts live in new/ and are imported as modules
+sys.path.append(NEW)
+
+import cleaning
+import cohort
+import streaming
+import rendering
+
+COMMANDS = ['clean', 'tables', 'charts', 'report', 'stats']
+YEARS = ['2024', '2025']
+
+DATA_2024 = os.path.join(ROOT, 'operated_eye_va_data.csv')
+# The 2024 tables are built from this copy of the data (as in create_impact_tables.py)
+TABLES_DATA_2024 = os.path.join(ROOT, 'operated_eye_va_data_fixed.csv')
+DATA_2025 = os.path.join(NEW, 'operated_eye_va_data.csv')
+
+# Datasets cleaned by the clean stage (see cleaning.DATASETS)
+CLEAN_DATASETS = {'2024': 'registry-2024', '2025': 'registry-2025'}
+
+
+class Session:
+    """The datasets of one invocation: each CSV is parsed once and its encoded cohort derived once"""
+
+    def __init__(self):
+        self._raw = {}
+        self._cohorts = {}
+
+    def frame(self, path):
+        """A copy of the raw frame, for stages that add columns to it"""
+        if path not in self._raw:
+            self._raw[path] = pd.read_csv(path)
+        return self._raw[path].copy()
+
+    def cohort(self, path):
+        if path not in self._cohorts:
+            self._cohorts[path] = cohort.encode_cohort(self._raw[path] if path in self._raw else self.frame(path))
+        return self._cohorts[path]
+
+    def aggregate(self, path, dimensions):
+        return streaming.aggregate_frame(self.cohort(path), dimensions)
+
+    def update(self, path, df):
+        """Replace a dataset (after cleaning it) so later stages see the new rows"""
+        self._raw[path] = df
+        self._cohorts.pop(path, None)
+
+
+def clean(session, years):
+    for year in years:
+        path, rules = cleaning.DATASETS[CLEAN_DATASETS[year]]
+        path = os.path.join(ROOT, path)
+        df, report = cleaning.clean_frame(session.frame(path), rules)
+        print(f"[clean {year}] {os.path.relpath(path, ROOT)} ({len(rules)} rules)")
+        cleaning.print_report(report)
+        if any(changed for _, changed in report):
+            df.to_csv(path, index=False)
+            session.update(path, df)
+            print(f"[clean {year}] Saved the standardised data to {os.path.relpath(path, ROOT)}")
+
+
+def tables(session, years):
+    if '2024' in years:
+        import create_impact_tables
+        out_dir = os.path.join(ROOT, 'tables')
+        create_impact_tables.write_tables(session.aggregate(TABLES_DATA_2024, create_impact_tables.DIMENSIONS),
+                                          out_dir, workers=args.workers)
+        print(f"[tables 2024] Wrote the impact tables to {os.path.relpath(out_dir, ROOT)}")
+    if '2025' in years:
+        import create_tables
+        out_dir = os.path.join(NEW, 'tables')
+        create_tables.write_tables(session.aggregate(DATA_2025, create_tables.DIMENSIONS), out_dir,
+                                   workers=args.workers)
+        print(f"[tables 2025] Wrote the report tables to {os.path.relpath(out_dir, ROOT)}")
+
+
+def chart_jobs_2024(session):
+    import analyze_eye_camp_data
+    import create_va_journey_chart
+    import create_ordered_va_chart
+
+    out_dir = os.path.join(ROOT, 'visualizations')
+    df = analyze_eye_camp_data.prepare(session.frame(DATA_2024))
+    jobs = analyze_eye_camp_data.chart_jobs(df, analyze_eye_camp_data.improvement_frame(df),
+                                            analyze_eye_camp_data.success_frame(df),
+                                            analyze_eye_camp_data.cataract_frame(df), out_dir)
+    jobs += create_va_journey_chart.chart_jobs(create_va_journey_chart.cataract_frame(session.frame(DATA_2024)),
+                                               out_dir)
+    jobs += create_ordered_va_chart.chart_jobs(create_ordered_va_chart.cataract_frame(session.frame(DATA_2024)),
+                                               out_dir)
+    return jobs
+
+
+def chart_jobs_2025(session):
+    import analyze_eye_camps
+    import create_correct_visuals
+
+    out_dir = os.path.join(NEW, 'visualizations')
+    df = analyze_eye_camps.prepare(session.frame(DATA_2025))
+    jobs = analyze_eye_camps.chart_jobs(df, analyze_eye_camps.improvement_frame(df), out_dir)
+    df = session.frame(DATA_2025)
+    jobs += create_correct_visuals.chart_jobs(df, create_correct_visuals.prepare(df), out_dir)
+    return jobs
+
+
+def charts(session, years, args):
+    jobs = []
+    if '2024' in years:
+        jobs += chart_jobs_2024(session)
+    if '2025' in years:
+        jobs += chart_jobs_2025(session)
+
+    # create_correct_visuals.py redraws va_distribution_by_timepoint.png with all four time
+    # points; only the last job for a path is kept, so the earlier version is never drawn
+    jobs = list({job.path: job for job in jobs}.values())
+
+    rendering.apply_style()
+    for directory in {os.path.dirname(job.path) for job in jobs}:
+        os.makedirs(directory, exist_ok=True)
+    rendering.run_jobs(jobs, workers=args.workers, force=args.force_render, profiles=args.profiles)
+
+
+def report(session, years):
+    if '2025' not in years:
+        print("[report] Only the 2025 report (new/new.md) is generated; nothing to do for 2024")
+        return
+    import complete_md_update
+    path = os.path.join(NEW, 'new.md')
+    complete_md_update.write_report(session.cohort(DATA_2025)[complete_md_update.COLUMNS],
+                                    os.path.join(NEW, 'tables'), path)
+
+
+def stats(session, years):
+    if '2024' in years:
+        import analyze_eye_camp_data
+        df = analyze_eye_camp_data.prepare(session.frame(DATA_2024))
+        analyze_eye_camp_data.print_statistics(df, analyze_eye_camp_data.improvement_frame(df),
+                                               analyze_eye_camp_data.success_frame(df),
+                                               analyze_eye_camp_data.cataract_frame(df))
+    if '2025' in years:
+        import get_current_stats
+        get_current_stats.print_stats(session.aggregate(DATA_2025, get_current_stats.DIMENSIONS),
+                                      os.path.join(NEW, 'tables'))
+    equity_tests(session, years)
+
+
+def equity_tests(session, years):
+    """Test the "equal/consistent success across groups" claims on every success-table dimension"""
+    import significance
+    import create_impact_tables
+    import create_tables
+
+    dimensions = {'2024': (TABLES_DATA_2024, create_impact_tables.DIMENSIONS),
+                  '2025': (DATA_2025, create_tables.DIMENSIONS)}
+    for year in years:
+        path, dims = dimensions[year]
+        print(f"\n[stats {year}] Does success at 1 month differ between groups?")
+        # Cached by the CSV's content hash; only uncached dimensions are tested, on the Session's cohort
+        significance.print_results(significance.test_csv(path, dims, load=lambda: session.cohort(path)))
+
+
+STAGES = {'clean': clean, 'tables': tables, 'report': report, 'stats': stats}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Clean the data and build the tables, charts, report and statistics',
+                                     epilog='Commands run in the order: ' + ', '.join(COMMANDS))
+    parser.add_argument('commands', nargs='+', choices=COMMANDS, metavar='command',
+                        help='one or more of: ' + ', '.join(COMMANDS))
+    parser.add_argument('--year', dest='years', action='append', choices=YEARS,
+                        help='dataset to work on; repeat for both (default: both)')
+    rendering.add_render_arguments(parser)
+    args = parser.parse_args()
+
+    years = args.years or YEARS
+    session = Session()
+    for command in COMMANDS:
+        if command not in args.commands:
+            continue
+        print(f"\n=== {command} ({', '.join(years)}) ===")
+        if command == 'charts':
+            charts(session, years, args)
+        else:
+            STAGES[command](session, years)
@@ -0,0 +1,64 @@
+import ast
+import hashlib
+import os
+
+# Content fingerprints used to key caches on the data they were built from
+
+
+def file_fingerprint(path, block_size=1 << 20):
+    """Return a short hex digest of a file's bytes"""
+    digest = hashlib.blake2b(digest_size=8)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def frame_fingerprint(df):
+    """Return a short hex digest of a DataFrame's columns, dtypes and values"""
+    import pandas as pd
+
+    digest = hashlib.blake2b(digest_size=8)
+    digest.update(repr([(str(col), str(dtype)) for col, dtype in df.dtypes.items()]).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def local_modules(path, root):
+    """
+    The Python file at path and every local module it imports, directly or
+    through other local modules, as sorted absolute paths.
+
+    A module is local when <name>.py sits next to the importing file or in
+    root (scripts in new/ reach the shared modules of the repository root).
+    """
+    found, pending = set(), [os.path.abspath(path)]
+    while pending:
+        path = pending.pop()
+        if path in found:
+            continue
+        found.add(path)
+        with open(path, encoding='utf-8') as f:
+            tree = ast.parse(f.read(), filename=path)
+        names = set()
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                names.update(alias.name.split('.')[0] for alias in node.names)
+            elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+                names.add(node.module.split('.')[0])
+        # Neighbours first, then the shared modules of root
+        for name in names:
+            for directory in (os.path.dirname(path), root):
+                candidate = os.path.abspath(os.path.join(directory, f'{name}.py'))
+                if os.path.exists(candidate):
+                    pending.append(candidate)
+                    break
+    return sorted(found)
+
+
+def source_fingerprint(path, root):
+    """Return a short hex digest of the source of a Python file and the local modules it imports"""
+    digest = hashlib.blake2b(digest_size=8)
+    for module in local_modules(path, root):
+        digest.update(f'{os.path.relpath(module, root)}={file_fingerprint(module)}'.encode())
+    return digest.hexdigest()
@@ -1,43 +1,7 @@
-import pandas as pd
-import numpy as np
+"""Standardise the EYE column of Combined_Eye_Surgery_Dataset.csv (missing eyes get the most common value)"""
+import cleaning
 
-# Read the dataset
-print("Reading Combined_Eye_Surgery_Dataset.csv...")
-df = pd.read_csv('Combined_Eye_Surgery_Dataset.csv')
-
-print(f"Total number of records: {len(df)}")
-
-# Check current eye distribution
-print("\nCurrent eye distribution:")
-print(df['EYE'].value_counts())
-
-# Clean and standardize eye data
-print("\nStandardizing eye data...")
-
-# Remove any extra spaces
-df['EYE'] = df['EYE'].str.strip()
-
-# Replace problematic values and missing data
-df['EYE'] = df['EYE'].replace({'.': np.nan, '': np.nan})
-
-# Count missing values
-missing_eye = df['EYE'].isna().sum()
-print(f"\nMissing eye values: {missing_eye}")
-
-if missing_eye > 0:
-    # Get the mode (most common value)
-    eye_mode = df['EYE'].mode()[0]
-    print(f"Eye mode (most common): {eye_mode}")
-    
-    # Fill missing values with mode
-    df['EYE'].fillna(eye_mode, inplace=True)
-    print(f"Filled {missing_eye} missing eye values with '{eye_mode}'")
+df = cleaning.clean_csv('Combined_Eye_Surgery_Dataset.csv', cleaning.EYE_RULES)
 
 print("\nFinal eye distribution after standardization:")
 print(df['EYE'].value_counts())
-
-print(f"\nRemaining missing eye values: {df['EYE'].isna().sum()}")
-
-# Save the cleaned dataset
-df.to_csv('Combined_Eye_Surgery_Dataset.csv', index=False)
-print("\nEye data standardization complete. Dataset saved.")
\ No newline at end of file
@@ -0,0 +1,119 @@
+"""
+VA journeys as flows between vision categories, for Sankey/alluvial charts.
+
+Every eye's VA at each timepoint is put in a WHO vision category (or "Not
+recorded"), and its journey through the timepoints becomes one path, packed
+into a single integer: group * C**T + sum of category_t * C**(T - 1 - t) for
+C categories and T timepoints. The paths of all eyes - for every location at
+once - are counted with one hash count (factorize + bincount) and unpacked
+back into category labels, so the result has one row per distinct
+(group, path) whatever the number of eyes.
+
+step_flows() rolls the paths up into the eyes moving between the categories
+of consecutive timepoints, the links of a Sankey diagram.
+
+Usage:
+    python flows.py new/operated_eye_va_data.csv --by 'PHYSICAL ADDRSS'
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+import cohort
+import transitions
+import va_codec
+
+# Worst to best vision, then the eyes without a reading at that timepoint
+NOT_RECORDED = 'Not recorded'
+CATEGORIES = cohort.VISION_CATEGORIES + [NOT_RECORDED]
+
+# Fine VA code -> category index (the trailing entry catches missing and off-scale codes)
+_FINE_TO_CATEGORY = np.append(
+    np.digitize(np.arange(len(va_codec.FINE_SCALE)), cohort.VISION_CATEGORY_BINS[1:-1]),
+    CATEGORIES.index(NOT_RECORDED)).astype(np.int8)
+
+
+def category_codes(df, timepoints=transitions.TIMEPOINTS):
+    """(rows, timepoints) array of category indexes into CATEGORIES"""
+    fine = transitions.timepoint_codes(df, timepoints, 'fine')
+    return _FINE_TO_CATEGORY[np.where(fine >= 0, fine, -1)]
+
+
+def path_counts(df, timepoints=transitions.TIMEPOINTS, by=None):
+    """
+    Eyes per distinct category path, optionally per group of column by.
+
+    Returns one row per occupied (group, path): the group (if by), one
+    column per timepoint holding its category, and Eyes. Eyes with a missing
+    group are left out of a per-group count.
+    """
+    codes = category_codes(df, timepoints).astype(np.int64)
+    n_categories = len(CATEGORIES)
+
+    # Pack the whole path (and the group) into one key per eye
+    key = np.zeros(len(df), dtype=np.int64)
+    for t in range(len(timepoints)):
+        key = key * n_categories + codes[:, t]
+
+    group_labels = None
+    if by is not None:
+        groups, group_labels = pd.factorize(df[by])
+        keep = groups >= 0
+        key = groups[keep].astype(np.int64) * n_categories ** len(timepoints) + key[keep]
+
+    # One hash count over the keys: distinct keys and the number of eyes on each
+    cells, keys = pd.factorize(key)
+    eyes = np.bincount(cells, minlength=len(keys))
+
+    # Unpack each key back into its categories, last timepoint first
+    keys = np.asarray(keys)
+    columns = {}
+    for tp in reversed(timepoints):
+        keys, code = np.divmod(keys, n_categories)
+        columns[tp] = pd.Categorical.from_codes(code, categories=CATEGORIES)
+
+    paths = pd.DataFrame({tp: columns[tp] for tp in timepoints})
+    if by is not None:
+        paths.insert(0, by, np.asarray(group_labels)[keys])
+    paths['Eyes'] = eyes
+    sort_by = ([by] if by is not None else []) + list(timepoints)
+    return paths.sort_values(sort_by, kind='stable').reset_index(drop=True)
+
+
+def add_paths(paths, more, timepoints=transitions.TIMEPOINTS, by=None):
+    """Sum two path_counts() tables (e.g. a stored one and a new camp's), as path_counts() of both sets of eyes"""
+    keys = ([by] if by is not None else []) + list(timepoints)
+    return (pd.concat([paths, more], ignore_index=True)
+            .groupby(keys, observed=True, sort=True, as_index=False)['Eyes'].sum())
+
+
+def overall(paths, timepoints=transitions.TIMEPOINTS):
+    """Path counts summed over the groups"""
+    return paths.groupby(list(timepoints), observed=True, as_index=False)['Eyes'].sum()
+
+
+def step_flows(paths, timepoints=transitions.TIMEPOINTS, by=None):
+    """Eyes moving from each category to each category between consecutive timepoints (Sankey links)"""
+    keys = [by] if by is not None else []
+    steps = []
+    for start, end in zip(timepoints[:-1], timepoints[1:]):
+        links = (paths.groupby(keys + [start, end], observed=True)['Eyes'].sum().reset_index()
+                 .rename(columns={start: 'From', end: 'To'}))
+        links.insert(len(keys), 'Step', f'{start} -> {end}')
+        steps.append(links)
+    return pd.concat(steps, ignore_index=True)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Count the VA category paths of the eyes across the timepoints')
+    parser.add_argument('data_file', nargs='?', default='operated_eye_va_data.csv', help='surgery CSV')
+    parser.add_argument('--by', help='count the paths per group of this column (e.g. the location)')
+    parser.add_argument('--top', type=int, default=10, help='most common paths listed per group')
+    args = parser.parse_args()
+
+    paths = path_counts(pd.read_csv(args.data_file), by=args.by)
+    groups = paths.groupby(args.by, sort=True) if args.by else [('All eyes', paths)]
+    for group, group_paths in groups:
+        print(f"\n{group}: {group_paths['Eyes'].sum()} eyes, {len(group_paths)} distinct paths")
+        print(group_paths.nlargest(args.top, 'Eyes').drop(columns=[args.by] if args.by else []).to_string(index=False))
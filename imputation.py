@@ -0,0 +1,110 @@
+"""
+Group-wise imputation of missing values.
+
+An Imputation fills the missing cells of one column with a strategy computed
+within groups of rows (any columns: SEX, location, procedure, ...):
+
+    median     the group's median (numbers, e.g. AGE by SEX)
+    mode       the group's most common value (ties go to the smallest value, as Series.mode())
+    alternate  the given values in turn over the group's missing cells (EYE: RE, LE, RE, ...)
+
+Each strategy is one groupby-transform over the whole column - there is no
+Python loop over groups or rows. Cells whose group has nothing to go on
+(all missing, or a missing group key) then get the strategy over the whole
+column as filled so far, the way impute_age_data.py fell back to the overall
+median. impute() can also record, per row, which columns were filled in an
+audit column.
+"""
+import numpy as np
+import pandas as pd
+
+# Default name of the audit column: the imputed column names of each row, ';'-separated
+AUDIT_COLUMN = 'IMPUTED'
+
+
+def _keys(df, by):
+    return [df[col] for col in by]
+
+
+def _median(s, df, by, values):
+    if not by:
+        return pd.Series(s.median(), index=s.index)
+    return s.groupby(_keys(df, by)).transform('median')
+
+
+def _mode(s, df, by, values):
+    if not by:
+        mode = s.mode()
+        return pd.Series(mode[0] if len(mode) else np.nan, index=s.index)
+    # Count each (group, value) pair once, keep the most common value per group
+    frame = pd.DataFrame({f'_key{i}': key for i, key in enumerate(_keys(df, by))}).assign(_value=s)
+    keys = list(frame.columns[:-1])
+    counts = frame.groupby(keys + ['_value']).size().rename('_rows')
+    top = (counts.reset_index()
+           .sort_values(['_rows', '_value'], ascending=[False, True], kind='stable')
+           .drop_duplicates(keys))
+    return frame[keys].merge(top[keys + ['_value']], on=keys, how='left')['_value'].set_axis(s.index)
+
+
+def _alternate(s, df, by, values):
+    missing = s.isna()
+    # Position of each missing cell among the missing cells of its group (NaN for a missing group key)
+    order = missing.groupby(_keys(df, by)).cumsum() if by else missing.cumsum()
+    lut = np.array(list(values) + [np.nan], dtype=object)
+    position = ((order - 1) % len(values)).fillna(len(values)).astype(int).to_numpy()
+    return pd.Series(lut[position], index=s.index).where(missing)
+
+
+STRATEGIES = {'median': _median, 'mode': _mode, 'alternate': _alternate}
+
+
+class Imputation:
+    """Fill the missing cells of column with strategy, computed within the groups of the by columns"""
+
+    def __init__(self, column, strategy, by=(), values=None):
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown imputation strategy {strategy!r}, expected one of {list(STRATEGIES)}")
+        if strategy == 'alternate' and not values:
+            raise ValueError("The alternate strategy needs the values to alternate between")
+        self.column = column
+        self.strategy = strategy
+        self.by = [by] if isinstance(by, str) else list(by)
+        self.values = values
+
+    def __repr__(self):
+        by = f' by {", ".join(self.by)}' if self.by else ''
+        return f'Imputation({self.column!r}, {self.strategy}{by})'
+
+    def fill(self, s, df):
+        """s with its missing cells imputed (df supplies the grouping columns)"""
+        strategy = STRATEGIES[self.strategy]
+        filled = s.fillna(strategy(s, df, self.by, self.values))
+        if self.by and filled.isna().any():
+            # Groups with nothing to go on get the strategy over the whole (partly filled) column
+            filled = filled.fillna(strategy(filled, df, [], self.values))
+        return filled
+
+
+def mark_imputed(df, mask, column, audit_column=AUDIT_COLUMN):
+    """Add column to the audit entries of the rows in mask (in place)"""
+    audit = df[audit_column].fillna('') if audit_column in df.columns else pd.Series('', index=df.index)
+    marked = np.where(audit == '', column, audit + ';' + column)
+    df[audit_column] = audit.where(~mask.to_numpy(), marked)
+
+
+def impute(df, imputations, audit_column=None):
+    """
+    Apply the imputations in order to a copy of df.
+
+    With audit_column, that column lists the columns imputed in each row
+    (';'-separated, empty when nothing was imputed).
+    """
+    df = df.copy()
+    if audit_column is not None and audit_column not in df.columns:
+        df[audit_column] = ''
+    for imputation in imputations:
+        before = df[imputation.column]
+        df[imputation.column] = imputation.fill(before, df)
+        if audit_column is not None:
+            mark_imputed(df, before.isna() & df[imputation.column].notna(), imputation.column, audit_column)
+    return df
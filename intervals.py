@@ -0,0 +1,106 @@
+"""
+Confidence intervals for the success rates of the report tables.
+
+wilson_interval() is the closed-form Wilson score interval. bootstrap_interval()
+is the percentile bootstrap: resampling a group's patients with replacement
+and counting the successes is a binomial draw with the group's size and
+observed rate, so all resamples of a block of groups are drawn in one NumPy
+call from the (successes, n) counts - no patient rows and no Python loop over
+resamples. Each block of groups has its own seed, so the intervals only depend
+on the seed, whether the blocks run in this process or on worker processes.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+BOOTSTRAP_RESAMPLES = 10_000
+# Fixed, so the tables come out the same on every run
+BOOTSTRAP_SEED = 2024
+# Groups drawn together in one call (bounds the resample matrix at BLOCK_GROUPS x resamples)
+BLOCK_GROUPS = 256
+
+
+def z_score(confidence=0.95):
+    """Two-sided standard normal critical value, e.g. 1.96 for 95%"""
+    return NormalDist().inv_cdf(0.5 + confidence / 2)
+
+
+def wilson_interval(successes, n, confidence=0.95):
+    """
+    Wilson score interval for binomial proportions, vectorised over groups.
+
+    Takes success counts and group sizes (scalars or arrays) and returns the
+    (low, high) bounds as proportions; groups with n == 0 get NaN.
+    """
+    successes = np.asarray(successes, dtype=float)
+    n = np.asarray(n, dtype=float)
+    z = z_score(confidence)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        p = successes / n
+        denominator = 1 + z**2 / n
+        centre = (p + z**2 / (2 * n)) / denominator
+        half_width = z * np.sqrt(p * (1 - p) / n + z**2 / (4 * n**2)) / denominator
+
+    return centre - half_width, centre + half_width
+
+
+def _bootstrap_block(successes, n, resamples, quantiles, seed):
+    """Percentile bounds for one block of groups, all resamples drawn at once"""
+    rng = np.random.default_rng(seed)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        p = np.where(n > 0, successes / n, 0.0)
+        draws = rng.binomial(n[:, None], p[:, None], size=(len(n), resamples)) / n[:, None]
+    return np.quantile(draws, quantiles, axis=1)
+
+
+def bootstrap_interval(successes, n, confidence=0.95, resamples=BOOTSTRAP_RESAMPLES, seed=BOOTSTRAP_SEED,
+                       workers=1):
+    """
+    Percentile bootstrap interval for binomial proportions, vectorised over groups.
+
+    Takes success counts and group sizes (arrays) and returns the (low, high)
+    bounds as proportions; groups with n == 0 get NaN. workers > 1 spreads the
+    blocks of groups over that many processes (None: one per CPU).
+    """
+    successes = np.rint(np.atleast_1d(np.asarray(successes, dtype=float))).astype(np.int64)
+    n = np.rint(np.atleast_1d(np.asarray(n, dtype=float))).astype(np.int64)
+    alpha = 1 - confidence
+    quantiles = [alpha / 2, 1 - alpha / 2]
+
+    starts = range(0, len(n), BLOCK_GROUPS)
+    seeds = np.random.SeedSequence(seed).spawn(len(starts))
+    blocks = [(successes[i:i + BLOCK_GROUPS], n[i:i + BLOCK_GROUPS], resamples, quantiles, s)
+              for i, s in zip(starts, seeds)]
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(blocks) <= 1:
+        bounds = [_bootstrap_block(*block) for block in blocks]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(blocks))) as pool:
+            bounds = list(pool.map(_bootstrap_block, *zip(*blocks)))
+
+    low, high = np.concatenate(bounds, axis=1) if bounds else np.empty((2, 0))
+    return low, high
+
+
+def add_intervals(table, confidence=0.95, resamples=BOOTSTRAP_RESAMPLES, seed=BOOTSTRAP_SEED, workers=1):
+    """
+    The success table with its Wilson and bootstrap interval bounds (%) added as columns.
+
+    table needs Total_Patients and Success_Count per group, as in the
+    tables/*_success.csv files.
+    """
+    table = table.copy()
+    successes, n = table['Success_Count'].to_numpy(), table['Total_Patients'].to_numpy()
+    bounds = {
+        'Wilson': wilson_interval(successes, n, confidence),
+        'Bootstrap': bootstrap_interval(successes, n, confidence, resamples, seed, workers),
+    }
+    for method, (low, high) in bounds.items():
+        table[f'{method}_CI_Low (%)'] = pd.Series(low * 100, index=table.index).round(1)
+        table[f'{method}_CI_High (%)'] = pd.Series(high * 100, index=table.index).round(1)
+    return table
@@ -0,0 +1,185 @@
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+import seaborn as sns
+
+import cohort
+import flows
+import va_codec
+import rendering
+
+# Labels for the four VA follow-up time points
+TIMEPOINT_LABELS = ['Pre-Operation', '1-Day Post-Op', '2-Weeks Post-Op', '1-Month Post-Op']
+
+# Reference lines on the coarse VA scale
+FUNCTIONAL_VISION = va_codec.code('6/18', 'coarse')
+LEGAL_BLINDNESS = va_codec.code('6/60', 'coarse')
+
+
+def median_from_histogram(hist):
+    """Median code of the readings counted in a VA histogram (same as Series.median on the codes)"""
+    hist = np.asarray(hist)
+    n = hist.sum()
+    if n == 0:
+        return np.nan
+    cumulative = np.cumsum(hist)
+    lower = np.searchsorted(cumulative, (n - 1) // 2, side='right')
+    upper = np.searchsorted(cumulative, n // 2, side='right')
+    return (lower + upper) / 2
+
+
+def draw_va_journey(time_points, medians, title, rotate_xticks=True):
+    """Draw the median coarse-scale VA at each time point on the current figure"""
+    journey_df = pd.DataFrame({'Time Point': time_points, 'Median VA': medians})
+    va_labels = va_codec.labels('coarse')
+
+    sns.lineplot(x='Time Point', y='Median VA', data=journey_df, marker='o', markersize=12, linewidth=3, color='#1f77b4')
+
+    # Add annotations for each point
+    for _, row in journey_df.iterrows():
+        va_value = row['Median VA']
+        va_label = va_codec.decode([va_value], 'coarse')[0]
+        if va_label is not None:
+            plt.annotate(f'{va_label}',
+                         (row['Time Point'], va_value),
+                         textcoords="offset points",
+                         xytext=(0, 10),
+                         ha='center',
+                         fontsize=12,
+                         fontweight='bold')
+
+    # Set y-axis ticks and labels
+    plt.yticks(range(len(va_labels)), va_labels)
+
+    # Add title and labels
+    plt.title(title, fontsize=18, fontweight='bold')
+    plt.xlabel('Time Point', fontsize=14)
+    plt.ylabel('Visual Acuity', fontsize=14)
+
+    # Add grid for better readability
+    plt.grid(True, linestyle='--', alpha=0.7)
+
+    # Reference lines for functional vision (6/18) and the legal blindness threshold (6/60)
+    plt.axhline(y=FUNCTIONAL_VISION, color='green', linestyle='--', alpha=0.7, label='Functional Vision (6/18)')
+    plt.axhline(y=LEGAL_BLINDNESS, color='red', linestyle='--', alpha=0.7, label='Legal Blindness Threshold (6/60)')
+
+    plt.legend(fontsize=12)
+    if rotate_xticks:
+        plt.xticks(rotation=45)
+    plt.tight_layout()
+
+
+def plot_va_journey(time_points, medians, title, path, figsize=(14, 8), rotate_xticks=True):
+    """Draw the journey chart and save it to path"""
+    with rendering.chart(path, figsize):
+        draw_va_journey(time_points, medians, title, rotate_xticks=rotate_xticks)
+
+
+def location_chart_path(location, out_dir='visualizations'):
+    location_safe = location.replace('/', '_').replace(' ', '_')
+    return f'{out_dir}/va_journey_cataract_{location_safe}.png'
+
+
+# Vision categories from the bottom of a flow chart to the top, and their colours (red to green)
+FLOW_STACK = [flows.NOT_RECORDED] + cohort.VISION_CATEGORIES
+FLOW_COLORS = dict(zip(FLOW_STACK, ['#bdbdbd'] + list(plt.cm.RdYlGn(np.linspace(0.1, 0.9, len(cohort.VISION_CATEGORIES))))))
+
+# Horizontal half-width of the category bars, and the vertical gap between them (fraction of the eyes)
+FLOW_NODE_WIDTH = 0.04
+FLOW_GAP = 0.03
+
+
+def flow_layout(paths, timepoints):
+    """
+    Bottom and top of every path at each timepoint, as (paths, timepoints) arrays.
+
+    Paths are stacked by their category at the timepoint (FLOW_STACK order,
+    with a gap between categories) and within a category by their categories
+    at the other timepoints, so the bands cross as little as they can.
+    """
+    eyes = paths['Eyes'].to_numpy(dtype=float)
+    stack = np.column_stack([paths[tp].map(FLOW_STACK.index).to_numpy(dtype=int) for tp in timepoints])
+    gap = FLOW_GAP * eyes.sum()
+    low = np.empty(stack.shape)
+    for t in range(len(timepoints)):
+        # lexsort takes its primary key last: the category here, then the others from pre-op on
+        order = np.lexsort(tuple(stack[:, u] for u in reversed(range(len(timepoints))) if u != t) + (stack[:, t],))
+        low[order, t] = np.cumsum(eyes[order]) - eyes[order] + gap * stack[order, t]
+    return low, low + eyes[:, None]
+
+
+def draw_va_flow(paths, time_points, title):
+    """
+    Alluvial chart of the eyes' vision categories across the timepoints on the current figure.
+
+    paths is a flows.path_counts() table (without a group column); each path
+    is a band coloured by its pre-op category.
+    """
+    timepoints = [col for col in paths.columns if col != 'Eyes']
+    paths = paths[paths['Eyes'] > 0]
+    low, high = flow_layout(paths, timepoints)
+    ax = plt.gca()
+
+    # Smooth S-shaped bands between consecutive timepoints
+    s = np.linspace(0, 1, 40)
+    ease = 3 * s ** 2 - 2 * s ** 3
+    origin = paths[timepoints[0]].to_numpy()
+    for i in range(len(paths)):
+        for t in range(len(timepoints) - 1):
+            x = t + FLOW_NODE_WIDTH + (1 - 2 * FLOW_NODE_WIDTH) * s
+            ax.fill_between(x, low[i, t] + (low[i, t + 1] - low[i, t]) * ease,
+                            high[i, t] + (high[i, t + 1] - high[i, t]) * ease,
+                            color=FLOW_COLORS[origin[i]], alpha=0.45, linewidth=0)
+
+    # Category bars with their eye counts
+    total = paths['Eyes'].sum()
+    for t, tp in enumerate(timepoints):
+        for category in FLOW_STACK:
+            rows = (paths[tp] == category).to_numpy()
+            if not rows.any():
+                continue
+            bottom, top = low[rows, t].min(), high[rows, t].max()
+            ax.bar(t, top - bottom, bottom=bottom, width=2 * FLOW_NODE_WIDTH, color=FLOW_COLORS[category],
+                   edgecolor='black', linewidth=0.5)
+            if top - bottom > 0.03 * total:
+                ax.text(t, (bottom + top) / 2, f'{int(top - bottom)}', ha='center', va='center',
+                        fontsize=9, fontweight='bold', rotation=90)
+
+    ax.set_xticks(range(len(timepoints)))
+    ax.set_xticklabels(time_points[:len(timepoints)], fontsize=12)
+    ax.set_yticks([])
+    ax.set_xlim(-0.3, len(timepoints) - 0.7)
+    for side in ['left', 'right', 'top']:
+        ax.spines[side].set_visible(False)
+    handles = [plt.Rectangle((0, 0), 1, 1, color=FLOW_COLORS[category]) for category in reversed(FLOW_STACK)]
+    ax.legend(handles, list(reversed(FLOW_STACK)), title='Vision category (colour: pre-op)',
+              bbox_to_anchor=(1.02, 1), loc='upper left')
+    plt.title(title, fontsize=18, fontweight='bold')
+    plt.tight_layout()
+
+
+def flow_chart_path(location=None, out_dir='visualizations'):
+    if location is None:
+        return f'{out_dir}/va_flow_cataract.png'
+    location_safe = location.replace('/', '_').replace(' ', '_')
+    return f'{out_dir}/va_flow_cataract_{location_safe}.png'
+
+
+def flow_chart_jobs(cataract_df, location_column, time_points, out_dir='visualizations', min_eyes=5):
+    """Render jobs for the overall flow chart and one per location with at least min_eyes eyes"""
+    # The paths of every location come out of one pass; the overall chart sums them
+    return flow_path_jobs(flows.path_counts(cataract_df, by=location_column), location_column, time_points,
+                          out_dir, min_eyes)
+
+
+def flow_path_jobs(paths, location_column, time_points, out_dir='visualizations', min_eyes=5, locations=None):
+    """flow_chart_jobs() from per-location path counts; locations limits the location charts to those given"""
+    jobs = [rendering.RenderJob(flow_chart_path(None, out_dir), draw_va_flow, flows.overall(paths), time_points,
+                                'Vision Category Flow for Cataract Patients - Overall')]
+    for location, location_paths in paths.groupby(location_column, sort=True):
+        if location_paths['Eyes'].sum() < min_eyes or (locations is not None and location not in locations):
+            continue
+        jobs.append(rendering.RenderJob(flow_chart_path(location, out_dir), draw_va_flow,
+                                        location_paths.drop(columns=location_column).reset_index(drop=True),
+                                        time_points, f'Vision Category Flow for Cataract Patients in {location}'))
+    return jobs
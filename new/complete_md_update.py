@@ -1,47 +1,82 @@
-import pandas as pd
-
-# Load the standardized data
-df = pd.read_csv('operated_eye_va_data.csv')
-
-# Calculate all the statistics we need
-total_patients = len(df)
-female_count = len(df[df['SEX'] == 'Female'])
-male_count = len(df[df['SEX'] == 'Male'])
-female_pct = female_count / total_patients * 100
-male_pct = male_count / total_patients * 100
-avg_age = df['AGE'].mean()
-age_60_plus = len(df[df['AGE'] >= 60])
-age_60_plus_pct = age_60_plus / len(df[df['AGE'].notna()]) * 100
-
-# Location counts
-masasi_count = len(df[df['PHYSICAL ADDRSS'] == 'MASASI'])
-siha_count = len(df[df['PHYSICAL ADDRSS'] == 'SIHA'])
-kivule_count = len(df[df['PHYSICAL ADDRSS'] == 'KIVULE'])
-mwanga_count = len(df[df['PHYSICAL ADDRSS'] == 'MWANGA'])
-
-# Procedure counts
-sics_count = len(df[df['CONFIRMED PROCEDURE'] == 'SICS'])
-pterygium_count = len(df[df['CONFIRMED PROCEDURE'] == 'PTERYGIUM'])
-sics_pct = sics_count / total_patients * 100
-pterygium_pct = pterygium_count / total_patients * 100
-
-# Eye counts
-re_count = len(df[df['EYE'] == 'RE'])
-le_count = len(df[df['EYE'] == 'LE'])
-
-# Load table data
-vision_impact = pd.read_csv('tables/vision_impact.csv')
-location_success = pd.read_csv('tables/location_success.csv')
-
-# Vision statistics
-functional_before = vision_impact[vision_impact['Vision Status'] == 'Functional Vision (6/18 or better)']['Before Surgery (%)'].iloc[0]
-functional_after = vision_impact[vision_impact['Vision Status'] == 'Functional Vision (6/18 or better)']['After Surgery (%)'].iloc[0]
-functional_change = vision_impact[vision_impact['Vision Status'] == 'Functional Vision (6/18 or better)']['Change (percentage points)'].iloc[0]
-
-print("📝 CREATING UPDATED new.md with ALL CORRECT NUMBERS...")
-
-# Create the updated markdown content
-content = f"""# Mo Dewji Foundation Eye Camp Surgeries Impact Report: 2025
+import os
+import sys
+
+# Shared helpers live in the repository root
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import cohort
+from report_renderer import Binding, Report, Section, csv_source, frame_source, rows
+
+DATA_FILE = 'operated_eye_va_data.csv'
+COLUMNS = ['SEX', 'AGE', 'PHYSICAL ADDRSS', 'CONFIRMED PROCEDURE', 'EYE']
+
+# Tables the report reads from tables_dir
+TABLES = ['vision_impact', 'location_success', 'procedure_success', 'gender_success', 'age_success']
+
+FUNCTIONAL = 'Functional Vision (6/18 or better)'
+
+# One markdown row per table record
+SUCCESS_ROW = "|              {Total_Patients:>3} |             {Success_Count:>3} |               {Success_Rate (%):>4.1f} |"
+LOCATION_ROW = "| {Location:<13} " + SUCCESS_ROW
+PROCEDURE_ROW = "| {Procedure Type:<15} " + SUCCESS_ROW
+GENDER_ROW = "| {SEX:<6} " + SUCCESS_ROW
+AGE_ROW = "| {Age_Group:<9} " + SUCCESS_ROW
+VISION_ROW = ("| {Vision Status:<34} |                 {Before Surgery (%):>4.1f} |                {After Surgery (%):>4.1f} "
+              "|                         {Change (percentage points):>4.1f} |")
+
+
+def count(column, value):
+    """Binding compute for the number of cohort rows with column == value"""
+    return lambda df: int((df[column] == value).sum())
+
+
+def share(column, value):
+    """Binding compute for the % of cohort rows with column == value"""
+    return lambda df: (df[column] == value).sum() / len(df) * 100
+
+
+def functional(column):
+    """Binding compute for a column of the functional vision row of the vision impact table"""
+    return lambda table: table.loc[table['Vision Status'] == FUNCTIONAL, column].iloc[0]
+
+
+def table_rows(row_template, counts=('Total_Patients', 'Success_Count')):
+    """Binding compute for the markdown rows of a table (its count columns written as integers)"""
+    def compute(table):
+        table = table.astype({column: int for column in counts if column in table})
+        return rows(table, row_template)
+    return compute
+
+
+BINDINGS = {
+    'total_patients': Binding(len, 'cohort'),
+    'female_count': Binding(count('SEX', 'Female'), 'cohort'),
+    'male_count': Binding(count('SEX', 'Male'), 'cohort'),
+    'female_pct': Binding(share('SEX', 'Female'), 'cohort'),
+    'male_pct': Binding(share('SEX', 'Male'), 'cohort'),
+    'avg_age': Binding(lambda df: df['AGE'].mean(), 'cohort'),
+    'age_60_plus_pct': Binding(lambda df: (df['AGE'] >= 60).sum() / df['AGE'].notna().sum() * 100, 'cohort'),
+    'masasi_count': Binding(count('PHYSICAL ADDRSS', 'MASASI'), 'cohort'),
+    'siha_count': Binding(count('PHYSICAL ADDRSS', 'SIHA'), 'cohort'),
+    'kivule_count': Binding(count('PHYSICAL ADDRSS', 'KIVULE'), 'cohort'),
+    'mwanga_count': Binding(count('PHYSICAL ADDRSS', 'MWANGA'), 'cohort'),
+    'sics_count': Binding(count('CONFIRMED PROCEDURE', 'SICS'), 'cohort'),
+    'pterygium_count': Binding(count('CONFIRMED PROCEDURE', 'PTERYGIUM'), 'cohort'),
+    'sics_pct': Binding(share('CONFIRMED PROCEDURE', 'SICS'), 'cohort'),
+    'pterygium_pct': Binding(share('CONFIRMED PROCEDURE', 'PTERYGIUM'), 'cohort'),
+    're_count': Binding(count('EYE', 'RE'), 'cohort'),
+    'le_count': Binding(count('EYE', 'LE'), 'cohort'),
+    'functional_before': Binding(functional('Before Surgery (%)'), 'vision_impact'),
+    'functional_after': Binding(functional('After Surgery (%)'), 'vision_impact'),
+    'functional_change': Binding(functional('Change (percentage points)'), 'vision_impact'),
+    'location_rows': Binding(table_rows(LOCATION_ROW), 'location_success'),
+    'procedure_rows': Binding(table_rows(PROCEDURE_ROW), 'procedure_success'),
+    'vision_rows': Binding(table_rows(VISION_ROW), 'vision_impact'),
+    'gender_rows': Binding(table_rows(GENDER_ROW), 'gender_success'),
+    'age_rows': Binding(table_rows(AGE_ROW), 'age_success'),
+}
+
+SECTIONS = [
+    Section('overview', """# Mo Dewji Foundation Eye Camp Surgeries Impact Report: 2025
 
 This report presents the surgical impact of the Mo Dewji Foundation free eye camps conducted in Tanzania during 2025, focusing specifically on surgical interventions that transformed lives through restored vision. The analysis covers {total_patients} surgical patients who underwent procedures across four eye camp locations.
 
@@ -76,17 +111,14 @@ The Mo Dewji Foundation eye camp surgeries were performed across four locations
 ![Location Distribution](visualizations/location_distribution.png)
 *Geographic distribution shows successful outreach to multiple communities*
 
-|| Location       |   Total_Patients |   Success_Count |   Success_Rate (%) |
-||:---------------|-----------------:|----------------:|-------------------:|"""
+"""),
+    Section('location_table', """| Location       |   Total_Patients |   Success_Count |   Success_Rate (%) |
+|:---------------|-----------------:|----------------:|-------------------:|
+{location_rows}
 
-# Add location success table
-for _, row in location_success.iterrows():
-    content += f"\n|| {row['Location']:<13} |              {int(row['Total_Patients']):>3} |             {int(row['Success_Count']):>3} |               {row['Success_Rate (%)']:>4.1f} |"
 
-content += f"""
-
-
-![Eye Distribution](visualizations/eye_distribution.png)
+"""),
+    Section('clinical', """![Eye Distribution](visualizations/eye_distribution.png)
 *Equal treatment of left and right eyes, demonstrating comprehensive surgical care*
 
 ## Clinical Impact
@@ -99,32 +131,25 @@ The surgical interventions addressed the most pressing eye health needs in the c
 
 ![Procedure Distribution](visualizations/procedure_distribution.png)
 *Focus on high-impact procedures that address the most common causes of vision impairment*
-"""
 
-# Add procedure success table (read from CSV)
-procedure_success = pd.read_csv('tables/procedure_success.csv')
-content += "\n|| Procedure Type   |   Total_Patients |   Success_Count |   Success_Rate (%) |\n"
-content += "||:-----------------|-----------------:|----------------:|-------------------:|\n"
-for _, row in procedure_success.iterrows():
-    content += f"|| {row['Procedure Type']:<15} |              {int(row['Total_Patients']):>3} |             {int(row['Success_Count']):>3} |               {row['Success_Rate (%)']:>4.1f} |\n"
+"""),
+    Section('procedure_table', """| Procedure Type   |   Total_Patients |   Success_Count |   Success_Rate (%) |
+|:-----------------|-----------------:|----------------:|-------------------:|
+{procedure_rows}
 
-content += f"""
 
-## Vision Transformation
+"""),
+    Section('vision_table', """## Vision Transformation
 
 The surgical interventions achieved remarkable improvements in patients' vision:
 
-|| Vision Status                      |   Before Surgery (%) |   After Surgery (%) |   Change (percentage points) |
-||:-----------------------------------|---------------------:|--------------------:|-----------------------------:|"""
-
-# Add vision impact table
-for _, row in vision_impact.iterrows():
-    content += f"\n|| {row['Vision Status']:<34} |                 {row['Before Surgery (%)']:>4.1f} |                {row['After Surgery (%)']:>4.1f} |                         {row['Change (percentage points)']:>4.1f} |"
-
-content += f"""
+| Vision Status                      |   Before Surgery (%) |   After Surgery (%) |   Change (percentage points) |
+|:-----------------------------------|---------------------:|--------------------:|-----------------------------:|
+{vision_rows}
 
 
-- **Functional Vision Gained**: From {functional_before}% to {functional_after}% of surgical patients with functional vision (6/18 or better)
+"""),
+    Section('vision_journeys', """- **Functional Vision Gained**: From {functional_before}% to {functional_after}% of surgical patients with functional vision (6/18 or better)
 - **Independence Restored**: {functional_change} percentage point increase in patients able to function independently
 - **Quality of Life**: Dramatic shift from predominantly poor vision to good vision among those who received surgery
 
@@ -164,25 +189,22 @@ The Mo Dewji Foundation eye camps demonstrated remarkable success in transformin
 ## Success Rate Analysis by Demographics
 
 Success rates (achieving 6/18 or better vision) vary across different patient groups:
-"""
-
-# Add demographic success tables
-gender_success = pd.read_csv('tables/gender_success.csv')
-age_success = pd.read_csv('tables/age_success.csv')
-
-content += "\n### Gender-Based Success Rates\n\n"
-content += "|| Gender  |   Total_Patients |   Success_Count |   Success_Rate (%) |\n"
-content += "||:--------|-----------------:|----------------:|-------------------:|\n"
-for _, row in gender_success.iterrows():
-    content += f"|| {row['SEX']:<6} |              {int(row['Total_Patients']):>3} |             {int(row['Success_Count']):>3} |               {row['Success_Rate (%)']:>4.1f} |\n"
-
-content += "\n### Age-Based Success Rates\n\n"
-content += "|| Age Group  |   Total_Patients |   Success_Count |   Success_Rate (%) |\n"
-content += "||:-----------|-----------------:|----------------:|-------------------:|\n"
-for _, row in age_success.iterrows():
-    content += f"|| {row['Age_Group']:<9} |              {int(row['Total_Patients']):>3} |             {int(row['Success_Count']):>3} |               {row['Success_Rate (%)']:>4.1f} |\n"
-
-content += f"""
+"""),
+    Section('gender_table', """
+### Gender-Based Success Rates
+
+| Gender  |   Total_Patients |   Success_Count |   Success_Rate (%) |
+|:--------|-----------------:|----------------:|-------------------:|
+{gender_rows}
+"""),
+    Section('age_table', """
+### Age-Based Success Rates
+
+| Age Group  |   Total_Patients |   Success_Count |   Success_Rate (%) |
+|:-----------|-----------------:|----------------:|-------------------:|
+{age_rows}
+"""),
+    Section('insights', """
 
 ## Key Insights and Impact
 
@@ -201,18 +223,35 @@ The eye camp surgeries represent a significant public health intervention, trans
 ---
 
 *Report generated for Mo Dewji Foundation Eye Camps Programme 2025 - Surgical Impact Analysis*
-"""
-
-# Write the complete updated file
-with open('new.md', 'w', encoding='utf-8') as f:
-    f.write(content)
-
-print("✅ COMPLETE new.md REGENERATED with ALL CORRECT NUMBERS!")
-print(f"📊 Key statistics included:")
-print(f"  - Total patients: {total_patients}")
-print(f"  - Gender: {female_pct:.1f}% Female ({female_count}), {male_pct:.1f}% Male ({male_count})")
-print(f"  - Average age: {avg_age:.1f} years")
-print(f"  - SICS: {sics_count} ({sics_pct:.1f}%), Pterygium: {pterygium_count} ({pterygium_pct:.1f}%)")
-print(f"  - Vision improvement: {functional_before}% → {functional_after}% (+{functional_change} pp)")
-print(f"  - Eye distribution: RE {re_count}, LE {le_count}")
-print(f"  - Location distribution: MASASI {masasi_count}, SIHA {siha_count}, KIVULE {kivule_count}, MWANGA {mwanga_count}")
+"""),
+]
+
+
+def write_report(df, tables_dir='tables', path='new.md'):
+    """Render the report markdown from the cohort frame and the written tables (only the sections whose inputs changed)"""
+    sources = {'cohort': frame_source(df)}
+    sources.update({table: csv_source(os.path.join(tables_dir, f'{table}.csv')) for table in TABLES})
+    report = Report(SECTIONS, BINDINGS, sources)
+
+    print(f"📝 Rendering {path} from the section templates...")
+    report.render(path)
+
+    value = report.value
+    print(f"✅ {path} is up to date with ALL CORRECT NUMBERS!")
+    print(f"📊 Key statistics included:")
+    print(f"  - Total patients: {value('total_patients')}")
+    print(f"  - Gender: {value('female_pct'):.1f}% Female ({value('female_count')}), "
+          f"{value('male_pct'):.1f}% Male ({value('male_count')})")
+    print(f"  - Average age: {value('avg_age'):.1f} years")
+    print(f"  - SICS: {value('sics_count')} ({value('sics_pct'):.1f}%), "
+          f"Pterygium: {value('pterygium_count')} ({value('pterygium_pct'):.1f}%)")
+    print(f"  - Vision improvement: {value('functional_before')}% → {value('functional_after')}% "
+          f"(+{value('functional_change')} pp)")
+    print(f"  - Eye distribution: RE {value('re_count')}, LE {value('le_count')}")
+    print(f"  - Location distribution: MASASI {value('masasi_count')}, SIHA {value('siha_count')}, "
+          f"KIVULE {value('kivule_count')}, MWANGA {value('mwanga_count')}")
+
+
+if __name__ == '__main__':
+    # Load the standardized data (only the columns used here, from the columnar cache)
+    write_report(cohort.load_cohort(DATA_FILE, columns=COLUMNS))
@@ -0,0 +1,147 @@
+"""
+Charts drawn by analyze_eye_camps.py.
+
+Each function draws one chart on the current figure; rendering creates, saves
+and closes it. Only imported when charts are requested, so the statistics run
+without loading matplotlib and seaborn.
+"""
+import matplotlib.pyplot as plt
+import seaborn as sns
+
+
+def draw_gender_distribution(df):
+    ax = sns.countplot(x='SEX', data=df, palette='viridis', hue='SEX', legend=False)
+    plt.title('Gender Distribution of Patients', fontsize=16, fontweight='bold')
+    plt.xlabel('Gender', fontsize=14)
+    plt.ylabel('Number of Patients', fontsize=14)
+
+    # Add count labels on bars
+    for p in ax.patches:
+        ax.annotate(f'{int(p.get_height())}',
+                    (p.get_x() + p.get_width()/2., p.get_height()),
+                    ha='center', va='bottom', fontsize=12)
+
+    plt.tight_layout()
+
+
+def draw_age_distribution(df):
+    sns.histplot(data=df, x='AGE', bins=20, kde=True)
+    plt.title('Age Distribution of Patients', fontsize=16, fontweight='bold')
+    plt.xlabel('Age (Years)', fontsize=14)
+    plt.ylabel('Number of Patients', fontsize=14)
+    plt.axvline(df['AGE'].median(), color='red', linestyle='--', label=f'Median Age: {df["AGE"].median():.1f}')
+    plt.legend()
+    plt.tight_layout()
+
+
+def draw_age_categories(df, order):
+    ax = sns.countplot(x='Age_Category', data=df, order=order, palette='viridis', hue='Age_Category', legend=False)
+    plt.title('Age Categories of Patients', fontsize=16, fontweight='bold')
+    plt.xlabel('Age Category', fontsize=14)
+    plt.ylabel('Number of Patients', fontsize=14)
+
+    # Add count and percentage labels on bars
+    total = len(df)
+    for p in ax.patches:
+        height = p.get_height()
+        ax.annotate(f'{int(height)}\n({height/total:.1%})',
+                    (p.get_x() + p.get_width()/2., height),
+                    ha='center', va='bottom', fontsize=12)
+
+    plt.tight_layout()
+
+
+def draw_location_distribution(df):
+    ax = sns.countplot(y='PHYSICAL ADDRSS', data=df,
+                      order=df['PHYSICAL ADDRSS'].value_counts().index,
+                      palette='viridis', hue='PHYSICAL ADDRSS', legend=False)
+    plt.title('Geographic Distribution of Patients', fontsize=16, fontweight='bold')
+    plt.xlabel('Number of Patients', fontsize=14)
+    plt.ylabel('Location', fontsize=14)
+
+    # Add count labels on bars
+    for p in ax.patches:
+        ax.annotate(f'{int(p.get_width())}',
+                    (p.get_width(), p.get_y() + p.get_height()/2),
+                    ha='left', va='center', fontsize=12)
+
+    plt.tight_layout()
+
+
+def draw_procedure_distribution(df):
+    ax = sns.countplot(y='CONFIRMED PROCEDURE', data=df,
+                      order=df['CONFIRMED PROCEDURE'].value_counts().index,
+                      palette='viridis', hue='CONFIRMED PROCEDURE', legend=False)
+    plt.title('Procedure Distribution', fontsize=16, fontweight='bold')
+    plt.xlabel('Number of Patients', fontsize=14)
+    plt.ylabel('Procedure', fontsize=14)
+
+    # Add count and percentage labels
+    total = len(df)
+    for p in ax.patches:
+        width = p.get_width()
+        percentage = 100 * width / total
+        ax.text(width + 5,
+                p.get_y() + p.get_height()/2,
+                f'{int(width)} ({percentage:.1f}%)',
+                va="center", fontsize=12)
+
+    plt.tight_layout()
+
+
+def draw_eye_distribution(df):
+    ax = sns.countplot(x='EYE', data=df, palette='viridis', hue='EYE', legend=False)
+    plt.title('Eye Distribution', fontsize=16, fontweight='bold')
+    plt.xlabel('Eye', fontsize=14)
+    plt.ylabel('Number of Patients', fontsize=14)
+
+    # Add count and percentage labels on bars
+    total = len(df)
+    for p in ax.patches:
+        height = p.get_height()
+        ax.annotate(f'{int(height)}\n({height/total:.1%})',
+                    (p.get_x() + p.get_width()/2., height),
+                    ha='center', va='bottom', fontsize=12)
+
+    plt.tight_layout()
+
+
+def draw_va_distribution_by_timepoint(df, va_values):
+    # Create subplots for before and after
+    plt.subplot(1, 2, 1)
+    preop_counts = df['PRE_OP_VA'].value_counts()
+    preop_counts = preop_counts.reindex(va_values)
+    preop_counts = preop_counts.dropna()
+    plt.barh(preop_counts.index, preop_counts.values, color='darkred')
+    plt.title('Pre-Op Visual Acuity', fontsize=16)
+    plt.xlabel('Number of Patients', fontsize=14)
+    plt.ylabel('Visual Acuity', fontsize=14)
+
+    plt.subplot(1, 2, 2)
+    postop_counts = df['1_MONTH_POST_OP_VA'].value_counts()
+    postop_counts = postop_counts.reindex(va_values)
+    postop_counts = postop_counts.dropna()
+    plt.barh(postop_counts.index, postop_counts.values, color='darkgreen')
+    plt.title('1-Month Post-Op Visual Acuity', fontsize=16)
+    plt.xlabel('Number of Patients', fontsize=14)
+
+    plt.tight_layout()
+
+
+def draw_improvement_categories(improvement_df, order):
+    ax = sns.countplot(x='Improvement_Category', data=improvement_df,
+                      order=order,
+                      palette='viridis', hue='Improvement_Category', legend=False)
+    plt.title('Visual Acuity Improvement Categories', fontsize=16, fontweight='bold')
+    plt.xlabel('Improvement Category', fontsize=14)
+    plt.ylabel('Number of Patients', fontsize=14)
+
+    # Add count and percentage labels on bars
+    total = len(improvement_df)
+    for p in ax.patches:
+        height = p.get_height()
+        ax.annotate(f'{int(height)}\n({height/total:.1%})',
+                    (p.get_x() + p.get_width()/2., height),
+                    ha='center', va='bottom', fontsize=12)
+
+    plt.tight_layout()
@@ -1,19 +1,12 @@
-import pandas as pd
+"""Convert M/F to Male/Female and strip the EYE values in operated_eye_va_data.csv"""
+import os
+import sys
 
-# Load the data
-df = pd.read_csv('operated_eye_va_data.csv')
-print(f"Before cleanup: {len(df)} records")
+# Shared helpers live in the repository root
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import cleaning
 
-# Clean gender data
-df['SEX'] = df['SEX'].replace({'F': 'Female', 'M': 'Male'})
-print("Gender values after cleanup:", df['SEX'].value_counts())
-
-# Clean eye data - remove extra spaces
-df['EYE'] = df['EYE'].str.strip()
-print("Eye values after cleanup:", df['EYE'].value_counts())
-
-# Save cleaned data
-df.to_csv('operated_eye_va_data.csv', index=False)
+df = cleaning.clean_csv('operated_eye_va_data.csv', cleaning.SEX_LABEL_RULES + [cleaning.strip('EYE')])
 print("✅ Final data cleanup complete!")
 
 # Show final stats
@@ -1,58 +1,89 @@
 import pandas as pd
+import os
+import sys
+import argparse
 
-# Load the data
-df = pd.read_csv('operated_eye_va_data.csv')
-
-print("=== CURRENT STANDARDIZED DATA STATISTICS ===")
-print(f"Total patients: {len(df)}")
-
-# Gender breakdown
-female_count = len(df[df['SEX'] == 'Female'])
-male_count = len(df[df['SEX'] == 'Male'])
-female_pct = female_count / len(df) * 100
-male_pct = male_count / len(df) * 100
-print(f"Gender: Female {female_count} ({female_pct:.1f}%), Male {male_count} ({male_pct:.1f}%)")
-
-# Age
-avg_age = df['AGE'].mean()
-print(f"Average age: {avg_age:.1f} years")
-
-# Age categories for 60+ percentage
-age_60_plus = len(df[df['AGE'] >= 60])
-age_60_plus_pct = age_60_plus / len(df[df['AGE'].notna()]) * 100
-print(f"Patients 60+: {age_60_plus} ({age_60_plus_pct:.1f}%)")
-
-# Location breakdown
-print("\nLocation distribution:")
-location_counts = df['PHYSICAL ADDRSS'].value_counts()
-for location, count in location_counts.items():
-    print(f"  {location}: {count}")
-
-# Procedure breakdown
-print("\nProcedure distribution:")
-procedure_counts = df['CONFIRMED PROCEDURE'].value_counts()
-sics_count = procedure_counts.get('SICS', 0)
-pterygium_count = procedure_counts.get('PTERYGIUM', 0)
-sics_pct = sics_count / len(df) * 100
-pterygium_pct = pterygium_count / len(df) * 100
-print(f"  SICS: {sics_count} ({sics_pct:.1f}%)")
-print(f"  PTERYGIUM: {pterygium_count} ({pterygium_pct:.1f}%)")
-
-# Eye distribution
-print("\nEye distribution:")
-eye_counts = df['EYE'].value_counts()
-for eye, count in eye_counts.items():
-    print(f"  {eye}: {count}")
-
-print("\n=== VISION STATISTICS ===")
-# Load vision impact table
-vision_impact = pd.read_csv('tables/vision_impact.csv')
-print("Vision transformation:")
-for _, row in vision_impact.iterrows():
-    print(f"  {row['Vision Status']}: {row['Before Surgery (%)']}% → {row['After Surgery (%)']}% ({row['Change (percentage points)']} pp)")
-
-print("\n=== SUCCESS RATES BY LOCATION ===")
-# Load location success table
-location_success = pd.read_csv('tables/location_success.csv')
-for _, row in location_success.iterrows():
-    print(f"  {row['Location']}: {row['Total_Patients']} patients, {row['Success_Rate (%)']}% success rate")
+# Shared helpers live in the repository root
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import cohort
+import streaming
+
+DATA_FILE = 'operated_eye_va_data.csv'
+DIMENSIONS = ['SEX', 'Age_Group', 'PHYSICAL ADDRSS', 'CONFIRMED PROCEDURE', 'EYE']
+
+
+def print_stats(stats, tables_dir='tables'):
+    """Print the headline statistics from an OutcomeAggregate and the written tables"""
+    print("=== CURRENT STANDARDIZED DATA STATISTICS ===")
+    print(f"Total patients: {stats.rows}")
+
+    # Gender breakdown
+    gender_counts = stats.group_counts('SEX')
+    female_count = gender_counts.get('Female', 0)
+    male_count = gender_counts.get('Male', 0)
+    female_pct = female_count / stats.rows * 100
+    male_pct = male_count / stats.rows * 100
+    print(f"Gender: Female {female_count} ({female_pct:.1f}%), Male {male_count} ({male_pct:.1f}%)")
+
+    # Age
+    avg_age = stats.mean_age()
+    print(f"Average age: {avg_age:.1f} years")
+
+    # Age categories for 60+ percentage
+    age_counts = stats.group_counts('Age_Group')
+    age_60_plus = age_counts.reindex(['60-69', '70-79', '80+']).fillna(0).astype(int).sum()
+    age_60_plus_pct = age_60_plus / stats.age_count * 100
+    print(f"Patients 60+: {age_60_plus} ({age_60_plus_pct:.1f}%)")
+
+    # Location breakdown
+    print("\nLocation distribution:")
+    location_counts = stats.group_counts('PHYSICAL ADDRSS')
+    for location, count in location_counts.items():
+        print(f"  {location}: {count}")
+
+    # Procedure breakdown
+    print("\nProcedure distribution:")
+    procedure_counts = stats.group_counts('CONFIRMED PROCEDURE')
+    sics_count = procedure_counts.get('SICS', 0)
+    pterygium_count = procedure_counts.get('PTERYGIUM', 0)
+    sics_pct = sics_count / stats.rows * 100
+    pterygium_pct = pterygium_count / stats.rows * 100
+    print(f"  SICS: {sics_count} ({sics_pct:.1f}%)")
+    print(f"  PTERYGIUM: {pterygium_count} ({pterygium_pct:.1f}%)")
+
+    # Eye distribution
+    print("\nEye distribution:")
+    eye_counts = stats.group_counts('EYE')
+    for eye, count in eye_counts.items():
+        print(f"  {eye}: {count}")
+
+    print("\n=== VISION STATISTICS ===")
+    # Load vision impact table
+    vision_impact = pd.read_csv(os.path.join(tables_dir, 'vision_impact.csv'))
+    print("Vision transformation:")
+    for _, row in vision_impact.iterrows():
+        print(f"  {row['Vision Status']}: {row['Before Surgery (%)']}% → {row['After Surgery (%)']}% ({row['Change (percentage points)']} pp)")
+
+    print("\n=== SUCCESS RATES BY LOCATION ===")
+    # Load location success table
+    location_success = pd.read_csv(os.path.join(tables_dir, 'location_success.csv'))
+    for _, row in location_success.iterrows():
+        print(f"  {row['Location']}: {row['Total_Patients']} patients, {row['Success_Rate (%)']}% success rate")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Print the headline statistics of the current dataset')
+    parser.add_argument('--stream', action='store_true',
+                        help='read the registry in chunks with bounded memory instead of loading it whole')
+    parser.add_argument('--chunksize', type=int, default=streaming.DEFAULT_CHUNKSIZE,
+                        help='rows per chunk in streaming mode')
+    args = parser.parse_args()
+
+    # Aggregate the data (only the columns used here, from the columnar cache unless streaming)
+    if args.stream:
+        stats = streaming.aggregate_csv(DATA_FILE, DIMENSIONS, chunksize=args.chunksize)
+    else:
+        df = cohort.load_cohort(DATA_FILE, columns=DIMENSIONS + ['AGE', '1_MONTH_POST_OP_VA'])
+        stats = streaming.aggregate_frame(df, DIMENSIONS)
+
+    print_stats(stats)
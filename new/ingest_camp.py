@@ -0,0 +1,219 @@
+"""
+Append a new eye camp's surgery records to operated_eye_va_data.csv incrementally.
+
+Only the new camp's rows are standardised, given SNs and appended to the
+registry CSV. The stored registry state (outcome aggregates plus per-location
+cataract VA histograms) is updated with those rows, then the tables and the
+journey charts of the affected locations are rewritten from the state, so the
+cost grows with the size of the new camp rather than the whole registry.
+The state also keeps each location's vision-category path counts, so the
+flow charts are refreshed the same way. Charts go through rendering.run_jobs
+in the report style, and the tables and charts are written next to the
+registry.
+The state also records the content fingerprint of every camp file ingested,
+so ingesting the same file again is skipped instead of duplicating its rows.
+
+Usage: python ingest_camp.py MASASI___restructured.csv
+"""
+import pandas as pd
+import numpy as np
+import os
+import sys
+import pickle
+import argparse
+
+# Shared helpers live in the repository root
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import cleaning
+import cohort
+import flows
+import rendering
+import streaming
+import va_codec
+import journey_charts
+import create_tables
+from fingerprint import file_fingerprint
+
+REGISTRY_FILE = 'operated_eye_va_data.csv'
+LOCATION_COLUMN = 'PHYSICAL ADDRSS'
+
+# Locations need at least this many cataract patients for a journey chart (as in create_correct_visuals.py)
+MIN_JOURNEY_PATIENTS = 5
+
+# Bumped when the stored state gains fields; an older state is rebuilt from the registry
+STATE_VERSION = 2
+
+
+def standardize_camp(df):
+    """Apply the registry's cleaning rules to a new camp's rows"""
+    return cleaning.clean_frame(df, cleaning.CAMP_RULES)[0]
+
+
+def state_path(registry):
+    root, _ = os.path.splitext(registry)
+    return f'{root}.state.pkl'
+
+
+class RegistryState:
+    """Running aggregates of the registry, persisted next to it between ingests"""
+
+    def __init__(self, registry):
+        self.registry = registry
+        self.version = STATE_VERSION
+        self.file_size = None
+        self.file_mtime = None
+        self.max_sn = 0
+        # Content fingerprint of every camp file ingested -> its file name and SN range
+        self.camps = {}
+        self.outcomes = streaming.OutcomeAggregate(create_tables.DIMENSIONS)
+        # location -> cataract patient count and (time point x coarse VA level) histogram
+        self.cataract_rows = {}
+        self.journeys = {}
+        # Cataract eyes per (location, vision category path), as flows.path_counts
+        self.flow_paths = None
+
+    def update(self, chunk):
+        """Fold encoded cohort rows into the state"""
+        self.max_sn = max(self.max_sn, int(chunk['SN'].max()))
+        self.outcomes.update(chunk)
+
+        cataract = chunk[cohort.is_cataract_surgery(chunk)]
+        n_levels = len(va_codec.COARSE_SCALE)
+        for location, rows in cataract.groupby(LOCATION_COLUMN, observed=True):
+            hist = np.zeros((len(cohort.VA_COLUMNS), n_levels), dtype=np.int64)
+            for i, col in enumerate(cohort.VA_COLUMNS):
+                codes = va_codec.fine_to_coarse(rows[col].cat.codes.to_numpy())
+                hist[i] = np.bincount(codes[codes >= 0], minlength=n_levels)
+            self.journeys[location] = self.journeys.get(location, 0) + hist
+            self.cataract_rows[location] = self.cataract_rows.get(location, 0) + len(rows)
+
+        paths = flows.path_counts(cataract, by=LOCATION_COLUMN)
+        paths[LOCATION_COLUMN] = paths[LOCATION_COLUMN].astype(object)
+        self.flow_paths = paths if self.flow_paths is None else flows.add_paths(self.flow_paths, paths,
+                                                                                 by=LOCATION_COLUMN)
+
+    def mark_synced(self):
+        stat = os.stat(self.registry)
+        self.file_size, self.file_mtime = stat.st_size, stat.st_mtime_ns
+
+    def is_synced(self):
+        stat = os.stat(self.registry)
+        return (self.file_size, self.file_mtime) == (stat.st_size, stat.st_mtime_ns)
+
+    def save(self):
+        with open(state_path(self.registry), 'wb') as f:
+            pickle.dump(self.__dict__, f)
+
+    @classmethod
+    def build(cls, registry, chunksize=streaming.DEFAULT_CHUNKSIZE):
+        """Full pass over the registry - only needed once, or after it was edited by hand"""
+        state = cls(registry)
+        for chunk in pd.read_csv(registry, chunksize=chunksize):
+            state.update(cohort.encode_cohort(chunk))
+        state.mark_synced()
+        return state
+
+    @classmethod
+    def load(cls, registry):
+        path = state_path(registry)
+        if os.path.exists(path):
+            state = cls(registry)
+            with open(path, 'rb') as f:
+                state.__dict__.update(pickle.load(f))
+            state.registry = registry
+            if state.__dict__.get('version') == STATE_VERSION and state.is_synced():
+                return state
+            if state.__dict__.get('version') != STATE_VERSION:
+                print(f"The stored state of {registry} is from an older version - rebuilding it")
+            else:
+                print(f"{registry} changed since the last ingest - rebuilding the registry state")
+            rebuilt = cls.build(registry)
+            # The registry rows do not say which camp file they came from, so keep the ingest record
+            rebuilt.camps = state.camps
+            return rebuilt
+        print(f"No stored state for {registry} - building it from the full registry")
+        return cls.build(registry)
+
+
+def append_rows(registry, rows):
+    """Append rows to the registry CSV without rewriting the existing ones"""
+    needs_newline = False
+    if os.path.getsize(registry) > 0:
+        with open(registry, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            needs_newline = f.read(1) != b'\n'
+    with open(registry, 'a', newline='') as f:
+        if needs_newline:
+            f.write('\n')
+        rows.to_csv(f, header=False, index=False)
+
+
+def chart_jobs(state, locations, out_dir='visualizations'):
+    """Render jobs for the overall journey and flow charts and those of the given locations, from the state"""
+    def medians(hist):
+        return [journey_charts.median_from_histogram(h) for h in hist]
+
+    overall = sum(state.journeys.values())
+    jobs = [rendering.RenderJob(f'{out_dir}/va_journey_cataract.png', journey_charts.draw_va_journey,
+                                journey_charts.TIMEPOINT_LABELS, medians(overall),
+                                'Visual Acuity Journey for Cataract Patients - Overall')]
+
+    for location in sorted(locations):
+        if state.cataract_rows.get(location, 0) < MIN_JOURNEY_PATIENTS:
+            print(f"Skipping {location} - only {state.cataract_rows.get(location, 0)} cataract patients")
+            continue
+        jobs.append(rendering.RenderJob(journey_charts.location_chart_path(location, out_dir),
+                                        journey_charts.draw_va_journey,
+                                        journey_charts.TIMEPOINT_LABELS, medians(state.journeys[location]),
+                                        f'Visual Acuity Journey for Cataract Patients in {location}'))
+
+    if state.flow_paths is not None:
+        jobs += journey_charts.flow_path_jobs(state.flow_paths, LOCATION_COLUMN, journey_charts.TIMEPOINT_LABELS,
+                                              out_dir, MIN_JOURNEY_PATIENTS, set(locations))
+    return jobs
+
+
+def ingest(camp_file, registry=REGISTRY_FILE, workers=None, force_render=False, profiles=None):
+    state = RegistryState.load(registry)
+
+    fingerprint = file_fingerprint(camp_file)
+    if fingerprint in state.camps:
+        name, first_sn, last_sn = state.camps[fingerprint]
+        print(f"{camp_file} was already ingested (as {name}, SN {first_sn}-{last_sn}) - skipping it")
+        state.save()
+        return False
+
+    camp = standardize_camp(pd.read_csv(camp_file))
+    camp['SN'] = np.arange(state.max_sn + 1, state.max_sn + 1 + len(camp))
+
+    # Match the registry's column order (columns it does not keep are dropped)
+    columns = pd.read_csv(registry, nrows=0).columns
+    camp = camp.reindex(columns=columns)
+
+    append_rows(registry, camp)
+    state.update(cohort.encode_cohort(camp))
+    state.camps[fingerprint] = (os.path.basename(camp_file), int(camp['SN'].min()), int(camp['SN'].max()))
+    state.mark_synced()
+
+    # The tables and charts live next to the registry, wherever this is run from
+    base = os.path.dirname(os.path.abspath(registry))
+    create_tables.write_tables(state.outcomes, os.path.join(base, 'tables'), workers=workers)
+    rendering.apply_style()
+    jobs = chart_jobs(state, camp[LOCATION_COLUMN].dropna().unique(), os.path.join(base, 'visualizations'))
+    rendering.run_jobs(jobs, workers=workers, force=force_render, profiles=profiles)
+    state.save()
+
+    print(f"Ingested {len(camp)} records from {camp_file} (SN {camp['SN'].min()}-{camp['SN'].max()})")
+    print(f"Registry now holds {state.outcomes.rows} records")
+    return True
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Append a new camp's records to the registry incrementally")
+    parser.add_argument('camp_file', help="CSV with the new camp's surgery records")
+    parser.add_argument('--registry', default=REGISTRY_FILE, help='registry CSV to append to')
+    rendering.add_render_arguments(parser)
+    args = parser.parse_args()
+
+    ingest(args.camp_file, args.registry, workers=args.workers, force_render=args.force_render,
+           profiles=args.profiles)
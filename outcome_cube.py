@@ -0,0 +1,195 @@
+"""
+Materialised outcome cube over sex x age group x location x procedure x eye.
+
+Each cell of the cube holds, for one combination of the dimensions, the number
+of operated eyes, the age sum/count and a fine-scale VA histogram for every
+timepoint (functional-vision counts are the upper part of a histogram). The
+cube is built once per version of the registry CSV and persisted next to it,
+so any breakdown - e.g. success by location for women over 60 who had SICS -
+is a slice and roll-up of a few hundred cells instead of a rescan of the rows.
+
+Usage:
+    python outcome_cube.py new/operated_eye_va_data.csv --by Location \
+        --where SEX=Female --where Age_Group=60-69,70-79,80+ --where Procedure=SICS
+"""
+import argparse
+import glob
+import os
+
+import numpy as np
+import pandas as pd
+
+import cohort
+import va_codec
+from fingerprint import file_fingerprint
+
+# Cube dimension -> cohort column (the location column differs between the datasets)
+DIMENSIONS = ['SEX', 'Age_Group', 'Location', 'Procedure', 'EYE']
+TIMEPOINTS = cohort.VA_COLUMNS
+SUCCESS_TIMEPOINT = '1_MONTH_POST_OP_VA'
+
+
+def _histogram_columns(timepoint):
+    return [f'{timepoint} {label}' for label in va_codec.FINE_SCALE]
+
+
+class OutcomeCube:
+    """Sparse cube: one row per occupied combination of DIMENSIONS, measure and histogram columns"""
+
+    def __init__(self, cells):
+        self.cells = cells
+
+    @classmethod
+    def from_cohort(cls, df):
+        """Build the cube from an encoded cohort frame in one pass over the rows"""
+        columns = {'SEX': 'SEX', 'Age_Group': 'Age_Group', 'Location': cohort.location_column(df),
+                   'Procedure': cohort.PROCEDURE_COLUMN, 'EYE': 'EYE'}
+
+        # Pack the dimension codes of each row into one key (digit 0 is a missing value)
+        categories = {dim: df[columns[dim]].cat.categories for dim in DIMENSIONS}
+        cohort.check_key_space({dim: len(categories[dim]) + 1 for dim in DIMENSIONS})
+        key = np.zeros(len(df), dtype=np.int64)
+        for dim in DIMENSIONS:
+            key = key * (len(categories[dim]) + 1) + (df[columns[dim]].cat.codes.to_numpy().astype(np.int64) + 1)
+        cells, keys = pd.factorize(key)
+        n_cells = len(keys)
+
+        age = df['AGE'].to_numpy(dtype=np.float64)
+        has_age = ~np.isnan(age)
+        data = {
+            'Rows': np.bincount(cells, minlength=n_cells),
+            'Age_Sum': np.bincount(cells, weights=np.where(has_age, age, 0.0), minlength=n_cells),
+            'Age_Count': np.bincount(cells, weights=has_age, minlength=n_cells).astype(np.int64),
+        }
+        n_levels = len(va_codec.FINE_SCALE)
+        for timepoint in TIMEPOINTS:
+            codes = df[timepoint].cat.codes.to_numpy().astype(np.int64)
+            recorded = codes >= 0
+            hist = np.bincount(cells[recorded] * n_levels + codes[recorded],
+                               minlength=n_cells * n_levels).reshape(n_cells, n_levels)
+            data.update(zip(_histogram_columns(timepoint), hist.T))
+
+        # Unpack each cell's key back into its dimension labels
+        labels = {}
+        keys = np.asarray(keys)
+        for dim in reversed(DIMENSIONS):
+            keys, digit = np.divmod(keys, len(categories[dim]) + 1)
+            labels[dim] = pd.Categorical.from_codes(digit - 1, categories=categories[dim],
+                                                    ordered=dim == 'Age_Group')
+
+        return cls(pd.DataFrame({**{dim: labels[dim] for dim in DIMENSIONS}, **data}))
+
+    def where(self, **filters):
+        """
+        Slice the cube, e.g. cube.where(SEX='Female', Age_Group=['60-69', '70-79', '80+']).
+
+        A filter value can be a single label or a list of labels.
+        """
+        mask = np.ones(len(self.cells), dtype=bool)
+        for dim, values in filters.items():
+            if dim not in DIMENSIONS:
+                raise ValueError(f"Unknown cube dimension {dim!r}, expected one of {', '.join(DIMENSIONS)}")
+            values = [values] if isinstance(values, str) else list(values)
+            labels = list(self.cells[dim].cat.categories)
+            unknown = [value for value in values if value not in labels]
+            if unknown:
+                raise ValueError(f"Unknown {dim} label(s) {', '.join(map(repr, unknown))}, "
+                                 f"expected one of {', '.join(map(str, labels))}")
+            mask &= self.cells[dim].isin(values).to_numpy()
+        return OutcomeCube(self.cells[mask])
+
+    def rollup(self, by=()):
+        """Sum the cells over every dimension not in `by`; returns a frame indexed by `by`"""
+        measures = self.cells.drop(columns=DIMENSIONS)
+        if not by:
+            return measures.sum().to_frame().T
+        return measures.groupby([self.cells[dim] for dim in by], observed=True).sum()
+
+    def histogram(self, timepoint):
+        """Fine-scale VA histogram of the cube's cells at one timepoint, indexed by label"""
+        counts = self.cells[_histogram_columns(timepoint)].sum().to_numpy()
+        return pd.Series(counts, index=va_codec.labels('fine'))
+
+    def functional_rate(self, timepoint):
+        """Fraction of recorded VA readings at this timepoint that are 6/18 or better"""
+        hist = self.histogram(timepoint).to_numpy()
+        return hist[cohort.FUNCTIONAL_CODE:].sum() / hist.sum()
+
+    def mean_age(self):
+        count = self.cells['Age_Count'].sum()
+        return self.cells['Age_Sum'].sum() / count if count else np.nan
+
+    def success_table(self, by):
+        """Total_Patients (1-month VA recorded) and Success_Count (6/18 or better) per group"""
+        by = [by] if isinstance(by, str) else list(by)
+        totals = self.rollup(by)
+        hist = totals[_histogram_columns(SUCCESS_TIMEPOINT)].to_numpy()
+        table = totals.index.to_frame(index=False) if by else pd.DataFrame(index=totals.index)
+        table['Total_Patients'] = hist.sum(axis=1).astype(int)
+        table['Success_Count'] = hist[:, cohort.FUNCTIONAL_CODE:].sum(axis=1).astype(float)
+        return table[totals['Rows'].to_numpy() > 0].reset_index(drop=True)
+
+    def save(self, path):
+        tmp = path + '.tmp'
+        self.cells.to_parquet(tmp, index=False)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        return cls(pd.read_parquet(path))
+
+
+def cube_path(path, fingerprint):
+    """Cube file kept next to the CSV, e.g. operated_eye_va_data.cube-<hash>.parquet"""
+    root, _ = os.path.splitext(path)
+    return f'{root}.cube-{fingerprint}.parquet'
+
+
+def load_cube(path='operated_eye_va_data.csv', cache=True):
+    """
+    Return the outcome cube of a surgery CSV.
+
+    Like load_cohort, the cube is persisted next to the CSV keyed by its
+    content hash, so it is only rebuilt after the CSV changes. Without pyarrow
+    it is built from the cohort every time.
+    """
+    if not (cache and cohort._parquet_available()):
+        return OutcomeCube.from_cohort(cohort.load_cohort(path, cache=False))
+
+    cached = cube_path(path, file_fingerprint(path))
+    if os.path.exists(cached):
+        return OutcomeCube.load(cached)
+
+    # Drop cubes built from older versions of the CSV
+    root, _ = os.path.splitext(path)
+    for stale in glob.glob(f'{glob.escape(root)}.cube-*.parquet'):
+        os.remove(stale)
+    cube = OutcomeCube.from_cohort(cohort.load_cohort(path))
+    cube.save(cached)
+    return cube
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Answer a breakdown query from the outcome cube')
+    parser.add_argument('data_file', nargs='?', default='operated_eye_va_data.csv', help='surgery CSV')
+    parser.add_argument('--by', action='append', default=[], choices=DIMENSIONS,
+                        help='dimension to break the results down by (repeatable)')
+    parser.add_argument('--where', action='append', default=[], metavar='DIM=LABEL[,LABEL...]',
+                        help='keep only these labels of a dimension (repeatable)')
+    args = parser.parse_args()
+
+    filters = {}
+    for condition in args.where:
+        dim, sep, values = condition.partition('=')
+        if not sep:
+            parser.error(f"--where {condition!r} is not DIM=LABEL[,LABEL...]")
+        filters[dim] = values.split(',')
+
+    try:
+        cube = load_cube(args.data_file).where(**filters)
+    except ValueError as error:
+        parser.error(str(error))
+    table = cube.success_table(args.by)
+    table['Success_Rate (%)'] = round(table['Success_Count'] / table['Total_Patients'] * 100, 1)
+    print(f"Operated eyes: {int(cube.rollup()['Rows'].iloc[0])}")
+    print(table.to_string(index=False))
@@ -0,0 +1,370 @@
+"""
+Chart rendering shared by the visualisation scripts.
+
+A chart is a RenderJob: a draw function, the (already aggregated or sliced)
+data it plots and the PNG path it is saved to. Jobs do not depend on each
+other, so run_jobs() can spread them over a pool of worker processes; the data
+is prepared once by the calling script and handed to the jobs.
+
+Every figure is created, saved and closed by the chart() context manager, so
+figures never accumulate, and the process's peak RSS is reported per chart.
+
+A drawn figure is written once per output profile (PROFILES): "print" is the
+300 dpi PNG the report has always used, "web" a screen-resolution lossless
+WebP and "svg" a vector copy. Profiles other than print are written next to
+the PNG, in a subdirectory named after the profile. Selecting several
+profiles saves the same figure several times; it is drawn only once.
+
+Each output file carries a fingerprint of what it was drawn from (the draw
+function's code, the source of its module and the local modules that imports,
+the data, the plot style, the matplotlib/seaborn versions and the profile) in
+its metadata.
+run_jobs() skips a chart whose files already have the fingerprint of the new
+job, and only writes the profiles that are missing or out of date.
+
+matplotlib and seaborn are imported by the functions that draw, so a script
+can import this module (for add_render_arguments, say) and still run its
+statistics without loading the plotting stack.
+"""
+import gc
+import hashlib
+import inspect
+import os
+import re
+import struct
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from fingerprint import source_fingerprint
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+DPI = 300
+DEFAULT_FIGSIZE = (14, 8)
+
+# PNG text chunk holding the render fingerprint (SVG and WebP store 'RenderFingerprint=<hash>')
+FINGERPRINT_KEY = 'RenderFingerprint'
+_FINGERPRINT_TEXT = re.compile(rb'RenderFingerprint=([0-9a-f]+)')
+
+# Comma-separated profile names used when a script is not given any
+PROFILES_ENV = 'RENDER_PROFILES'
+DEFAULT_PROFILES = ('print',)
+
+
+class Profile:
+    """How a figure is written: file format, resolution and extra Pillow options"""
+
+    def __init__(self, name, format, dpi, subdir=None, pil_kwargs=None):
+        self.name = name
+        self.format = format
+        self.dpi = dpi
+        self.subdir = subdir            # None writes to the chart's own path
+        self.pil_kwargs = pil_kwargs or {}
+
+    def path(self, path):
+        """Where this profile writes the chart whose print PNG is path"""
+        if self.subdir is None:
+            return path
+        directory, name = os.path.split(path)
+        return os.path.join(directory, self.subdir, f'{os.path.splitext(name)[0]}.{self.format}')
+
+    def __repr__(self):
+        return f'Profile({self.name!r}, {self.format!r}, {self.dpi!r}, {self.subdir!r}, {self.pil_kwargs!r})'
+
+
+PROFILES = {
+    'print': Profile('print', 'png', DPI),
+    # Screen resolution; lossless WebP is about an eighth of the print PNG
+    'web': Profile('web', 'webp', 100, subdir='web', pil_kwargs={'lossless': True}),
+    'svg': Profile('svg', 'svg', 100, subdir='svg'),
+}
+
+
+def resolve_profiles(names=None):
+    """The Profiles for names, else for $RENDER_PROFILES, else print only"""
+    if names is None:
+        names = [name.strip() for name in os.environ.get(PROFILES_ENV, '').split(',') if name.strip()]
+        names = names or DEFAULT_PROFILES
+    unknown = [name for name in names if name not in PROFILES]
+    if unknown:
+        raise ValueError(f"Unknown render profile(s) {', '.join(unknown)}; choose from {', '.join(PROFILES)}")
+    return [PROFILES[name] for name in dict.fromkeys(names)]
+
+
+def apply_style():
+    """The plot style every chart script uses"""
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    plt.style.use('ggplot')
+    sns.set(font_scale=1.2)
+    sns.set_style("whitegrid")
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far in MB, or None where it is not available"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def profile_fingerprint(fingerprint, profile):
+    """Fingerprint of one output file: the job's fingerprint plus the profile's settings"""
+    return hashlib.blake2b(f'{fingerprint}{profile!r}'.encode(), digest_size=16).hexdigest()
+
+
+def save_figure(fig, path, profile, fingerprint=None):
+    """Write fig to path in the given profile, storing the fingerprint in the file's metadata"""
+    kwargs = {'format': profile.format, 'dpi': profile.dpi, 'bbox_inches': 'tight'}
+    pil_kwargs = dict(profile.pil_kwargs)
+    if fingerprint:
+        if profile.format == 'png':
+            kwargs['metadata'] = {FINGERPRINT_KEY: fingerprint}
+        elif profile.format == 'svg':
+            kwargs['metadata'] = {'Description': f'{FINGERPRINT_KEY}={fingerprint}'}
+        elif profile.format == 'webp':
+            # matplotlib has no WebP metadata; Pillow writes the XMP packet as a RIFF chunk
+            pil_kwargs['xmp'] = (f'<x:xmpmeta xmlns:x="adobe:ns:meta/">{FINGERPRINT_KEY}={fingerprint}'
+                                 f'</x:xmpmeta>').encode()
+    if pil_kwargs:
+        kwargs['pil_kwargs'] = pil_kwargs
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    fig.savefig(path, **kwargs)
+
+
+@contextmanager
+def chart(path, figsize=DEFAULT_FIGSIZE, fingerprint=None, profiles=None):
+    """
+    Own the figure of one chart: create it (as the current figure), save it in
+    every profile (see resolve_profiles) when the block completes, and close it
+    - along with any other figure opened inside the block - even if drawing fails.
+    """
+    import matplotlib.pyplot as plt
+
+    profiles = resolve_profiles(profiles)
+    peak_before = peak_rss_mb()
+    open_before = set(plt.get_fignums())
+    fig = plt.figure(figsize=figsize)
+    try:
+        yield fig
+        for profile in profiles:
+            save_figure(fig, profile.path(path), profile,
+                        profile_fingerprint(fingerprint, profile) if fingerprint else None)
+    finally:
+        for num in set(plt.get_fignums()) - open_before:
+            plt.close(num)
+        # Figures hold reference cycles; free this one's canvas now rather than at some later collection
+        gc.collect()
+
+    saved = ', '.join(profile.path(path) for profile in profiles)
+    rss = peak_rss_mb()
+    if rss is None:
+        print(f"Saved {saved}")
+    else:
+        # ru_maxrss is the process high-water mark: the chart's share is how far it raised it
+        print(f"Saved {saved} (process peak RSS {rss:.0f} MB, +{rss - peak_before:.0f} MB during this chart)")
+
+
+def draw_rate_bars(labels, rates, ci=None, palette='viridis', ax=None):
+    """
+    Bar chart of precomputed rates, one bar per label, on the current axes.
+
+    ci is an optional (low, high) pair of arrays drawn as error bars. Nothing
+    is estimated here, so the cost depends on the number of bars only. The
+    look matches seaborn's barplot (desaturated palette, no x grid).
+    """
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    ax = ax or plt.gca()
+    x = np.arange(len(labels))
+    colors = [sns.desaturate(color, 0.75) for color in sns.color_palette(palette, len(labels))]
+    bars = ax.bar(x, rates, width=0.8, color=colors)
+    if ci is not None:
+        low, high = ci
+        ax.vlines(x, low, high, color='.26', linewidth=plt.rcParams['lines.linewidth'] * 1.8)
+    ax.set_xticks(x, labels)
+    ax.set_xlim(-0.5, len(labels) - 0.5)
+    ax.xaxis.grid(False)
+    return bars
+
+
+class RenderJob:
+    """One chart: draw(*args, **kwargs) draws it on the current figure, which is saved to path"""
+
+    def __init__(self, path, draw, *args, figsize=DEFAULT_FIGSIZE, **kwargs):
+        self.path = path
+        self.draw = draw
+        self.figsize = figsize
+        self.args = args
+        self.kwargs = kwargs
+
+
+def _hash_value(h, value):
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        h.update(repr((type(value).__name__, getattr(value, 'name', None), list(getattr(value, 'columns', [])),
+                       [str(dtype) for dtype in np.atleast_1d(value.dtypes)])).encode())
+        h.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+    elif isinstance(value, np.ndarray):
+        h.update(repr((value.dtype.str, value.shape)).encode())
+        h.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, pd.Index):
+        h.update(repr(list(value)).encode())
+    elif isinstance(value, (list, tuple)):
+        h.update(f'{type(value).__name__}{len(value)}'.encode())
+        for item in value:
+            _hash_value(h, item)
+    else:
+        h.update(repr(value).encode())
+
+
+@lru_cache(maxsize=None)
+def _code_fingerprint(module_name):
+    """Source fingerprint of a draw function's module and the local modules it imports (the helpers it calls)"""
+    path = getattr(sys.modules.get(module_name), '__file__', None)
+    return source_fingerprint(path, ROOT) if path else None
+
+
+def _library_versions():
+    import matplotlib
+    import seaborn
+
+    return f'matplotlib {matplotlib.__version__}, seaborn {seaborn.__version__}'
+
+
+def job_fingerprint(job):
+    """Hash of everything that determines the drawn figure: draw code and its helpers, data, style and libraries"""
+    import matplotlib.pyplot as plt
+
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f'{job.draw.__module__}.{job.draw.__qualname__}'.encode())
+    h.update(inspect.getsource(job.draw).encode())
+    h.update(repr(_code_fingerprint(job.draw.__module__)).encode())
+    h.update(_library_versions().encode())
+    _hash_value(h, job.args)
+    _hash_value(h, sorted(job.kwargs.items()))
+    _hash_value(h, job.figsize)
+    # The style is whatever apply_style() left in rcParams (the backend does not change the PNG)
+    style = sorted((key, value) for key, value in plt.rcParams.items() if not key.startswith('backend'))
+    h.update(repr(style).encode())
+    return h.hexdigest()
+
+
+def png_fingerprint(path):
+    """Fingerprint stored in a PNG's text chunks, or None (text chunks precede the image data)"""
+    try:
+        with open(path, 'rb') as f:
+            if f.read(8) != b'\x89PNG\r\n\x1a\n':
+                return None
+            while True:
+                header = f.read(8)
+                if len(header) < 8:
+                    return None
+                length, chunk_type = struct.unpack('>I4s', header)
+                if chunk_type == b'IDAT':
+                    return None
+                data = f.read(length)
+                f.seek(4, os.SEEK_CUR)  # CRC
+                if chunk_type == b'tEXt':
+                    key, _, value = data.partition(b'\0')
+                    if key.decode('latin-1') == FINGERPRINT_KEY:
+                        return value.decode('latin-1')
+    except FileNotFoundError:
+        return None
+
+
+def webp_fingerprint(path):
+    """Fingerprint stored in a WebP's XMP chunk, or None"""
+    try:
+        with open(path, 'rb') as f:
+            header = f.read(12)
+            if header[:4] != b'RIFF' or header[8:] != b'WEBP':
+                return None
+            while True:
+                chunk = f.read(8)
+                if len(chunk) < 8:
+                    return None
+                chunk_type, length = struct.unpack('<4sI', chunk)
+                if chunk_type != b'XMP ':
+                    f.seek(length + length % 2, os.SEEK_CUR)
+                    continue
+                match = _FINGERPRINT_TEXT.search(f.read(length))
+                return match.group(1).decode() if match else None
+    except FileNotFoundError:
+        return None
+
+
+def svg_fingerprint(path):
+    """Fingerprint stored in an SVG's description (the metadata block opens the file), or None"""
+    try:
+        with open(path, 'rb') as f:
+            match = _FINGERPRINT_TEXT.search(f.read(4096))
+            return match.group(1).decode() if match else None
+    except FileNotFoundError:
+        return None
+
+
+_FINGERPRINT_READERS = {'png': png_fingerprint, 'webp': webp_fingerprint, 'svg': svg_fingerprint}
+
+
+def stored_fingerprint(path, profile):
+    return _FINGERPRINT_READERS[profile.format](path)
+
+
+def render(job, fingerprint=None, profiles=None):
+    with chart(job.path, job.figsize, fingerprint, profiles):
+        job.draw(*job.args, **job.kwargs)
+    return [profile.path(job.path) for profile in resolve_profiles(profiles)]
+
+
+def run_jobs(jobs, workers=None, force=False, profiles=None):
+    """
+    Render the jobs whose output is missing or out of date and return the paths written.
+
+    workers is the number of processes (default: one per CPU). With a single
+    worker, or a single job, everything is rendered in this process. profiles
+    are the names of the output profiles to write (see resolve_profiles); a
+    job is drawn once and saved in each of its profiles that is out of date.
+    force re-renders every job regardless of the fingerprints.
+    """
+    profiles = resolve_profiles(profiles)
+    stale = []
+    for job in jobs:
+        fingerprint = job_fingerprint(job)
+        names = [profile.name for profile in profiles
+                 if force or stored_fingerprint(profile.path(job.path), profile)
+                 != profile_fingerprint(fingerprint, profile)]
+        if names:
+            stale.append((job, fingerprint, names))
+    print(f"Rendering {len(stale)} of {len(jobs)} charts ({len(jobs) - len(stale)} unchanged)")
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(stale) <= 1:
+        written = [render(*args) for args in stale]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(stale)), initializer=apply_style) as pool:
+            written = list(pool.map(render, *zip(*stale)))
+    return [path for paths in written for path in paths]
+
+
+def add_render_arguments(parser):
+    parser.add_argument('--workers', type=int, default=None,
+                        help='number of processes rendering charts in parallel (default: one per CPU)')
+    parser.add_argument('--force-render', action='store_true',
+                        help='redraw every chart even if its files are up to date')
+    parser.add_argument('--profile', dest='profiles', action='append', choices=list(PROFILES),
+                        help=f'output profile to write; repeat for several (default: ${PROFILES_ENV} or print). '
+                             'print: 300 dpi PNG, web: screen-resolution WebP, svg: vector')
@@ -0,0 +1,158 @@
+"""
+Markdown reports rendered from section templates.
+
+A report is a list of Sections, each a piece of markdown with str.format
+fields such as {female_pct:.1f} or {location_rows}. Every field is a named
+Binding: a function of one or more of the report's Sources (the cohort
+frame, a table CSV, ...). Tables are bound as their formatted rows (see
+rows()), so the markdown is written exactly as it should end up - there is no
+post-processing of the document.
+
+The sources a section reads follow from the fields of its template. A
+section's fingerprint is a hash of its template, the code of its bindings and
+the fingerprints of those sources, and the rendered text of every section is
+kept next to the report with its fingerprint. On the next render only the
+sections whose fingerprint changed are bound and formatted again (a new
+location table re-renders the location table section, nothing else), and the
+report is only rewritten when its text changed.
+"""
+import hashlib
+import inspect
+import json
+import os
+from string import Formatter
+
+import pandas as pd
+
+from fingerprint import file_fingerprint, frame_fingerprint
+
+
+class Source:
+    """Data a report reads, loaded at most once per render and identified by a fingerprint"""
+
+    def __init__(self, load, fingerprint):
+        self._load = load
+        self._fingerprint = fingerprint
+        self._value = None
+        self._loaded = False
+
+    def value(self):
+        if not self._loaded:
+            self._value, self._loaded = self._load(), True
+        return self._value
+
+    def fingerprint(self):
+        if callable(self._fingerprint):
+            self._fingerprint = self._fingerprint()
+        return self._fingerprint
+
+
+def csv_source(path):
+    """A table CSV, fingerprinted by its bytes"""
+    return Source(lambda: pd.read_csv(path), lambda: file_fingerprint(path))
+
+
+def frame_source(df):
+    """An in-memory frame (e.g. the cohort), fingerprinted by its values"""
+    return Source(lambda: df, lambda: frame_fingerprint(df))
+
+
+class Binding:
+    """A named template field: compute(*source values) for the named sources"""
+
+    def __init__(self, compute, *sources):
+        self.compute = compute
+        self.sources = sources
+
+    def code(self):
+        """Source of compute, with the values it closes over (e.g. the row template given to a factory)"""
+        if not inspect.isfunction(self.compute):
+            return repr(self.compute)
+        cells = [cell.cell_contents for cell in self.compute.__closure__ or ()]
+        return inspect.getsource(self.compute) + repr(cells)
+
+
+class Section:
+    """A named piece of the report: markdown with str.format fields naming bindings"""
+
+    def __init__(self, name, template):
+        self.name = name
+        self.template = template
+        self.fields = sorted({field for _, field, _, _ in Formatter().parse(template) if field})
+
+
+def rows(table, row_template):
+    """The rows of a markdown table: row_template formatted with each record of table, one per line"""
+    return '\n'.join(row_template.format_map(record) for record in table.to_dict('records'))
+
+
+def cache_path(path):
+    """Rendered sections kept next to the report, e.g. new.sections.json"""
+    root, _ = os.path.splitext(path)
+    return f'{root}.sections.json'
+
+
+class Report:
+    """Sections rendered from named bindings over the sources"""
+
+    def __init__(self, sections, bindings, sources):
+        self.sections = sections
+        self.bindings = bindings
+        self.sources = sources
+        self._values = {}
+
+    def value(self, name):
+        """The value of a binding (computed once)"""
+        if name not in self._values:
+            if name not in self.bindings:
+                raise KeyError(f"No binding named {name!r}, expected one of {sorted(self.bindings)}")
+            binding = self.bindings[name]
+            self._values[name] = binding.compute(*(self.sources[source].value() for source in binding.sources))
+        return self._values[name]
+
+    def fingerprint(self, section):
+        """Hash of the section's template, the code of its bindings and the fingerprints of their sources"""
+        h = hashlib.blake2b(digest_size=16)
+        h.update(section.template.encode())
+        for field in section.fields:
+            binding = self.bindings[field]
+            h.update(field.encode())
+            h.update(binding.code().encode())
+            for source in binding.sources:
+                h.update(f'{source}={self.sources[source].fingerprint()}'.encode())
+        return h.hexdigest()
+
+    def render_section(self, section):
+        return section.template.format_map({field: self.value(field) for field in section.fields})
+
+    def render(self, path, cache=True):
+        """Write the report to path, re-rendering only the sections whose inputs changed; returns their names"""
+        cached = {}
+        if cache and os.path.exists(cache_path(path)):
+            with open(cache_path(path), encoding='utf-8') as f:
+                cached = json.load(f)
+
+        entries, rendered = {}, []
+        for section in self.sections:
+            fingerprint = self.fingerprint(section)
+            entry = cached.get(section.name)
+            if entry is None or entry['fingerprint'] != fingerprint:
+                entry = {'fingerprint': fingerprint, 'text': self.render_section(section)}
+                rendered.append(section.name)
+            entries[section.name] = entry
+        content = ''.join(entries[section.name]['text'] for section in self.sections)
+
+        current = None
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                current = f.read()
+        if content != current:
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(content)
+        if cache:
+            with open(cache_path(path), 'w', encoding='utf-8') as f:
+                json.dump(entries, f, indent=2)
+
+        print(f"Rendered {len(rendered)} of {len(self.sections)} report sections "
+              f"({len(self.sections) - len(rendered)} unchanged)")
+        return rendered
@@ -0,0 +1,257 @@
+"""
+Tests of whether 1-month success differs between the groups of a dimension.
+
+The report says outcomes were equal for men and women and consistent across
+age groups; these are the tests behind such claims. For every dimension of
+the success tables (SEX, Age_Group, location, procedure, ...) the groups'
+success counts are tested with:
+
+    chi-square    Pearson's test of the groups x success/failure table
+    Fisher        Fisher's exact test, for dimensions with two groups
+    permutation   the share of label shuffles giving a chi-square statistic
+                  at least as large as the observed one
+
+The permutation test shuffles the success labels once into a matrix of
+permutations x patients; the group success counts of every dimension are then
+one matrix product of that matrix with the stacked group indicators of all the
+dimensions, so testing dozens of breakdowns is a single batched computation.
+
+Results are cached next to the CSV keyed by its content hash (like the cohort
+cache), one entry per dimension and test setting; only dimensions without an
+entry are computed.
+
+Usage:
+    python significance.py new/operated_eye_va_data.csv --by SEX --by Age_Group
+"""
+import argparse
+import glob
+import json
+import math
+import os
+
+import numpy as np
+import pandas as pd
+
+import cohort
+from fingerprint import file_fingerprint
+
+SUCCESS_TIMEPOINT = '1_MONTH_POST_OP_VA'
+PERMUTATIONS = 10_000
+# Fixed, so the p-values come out the same on every run
+PERMUTATION_SEED = 2024
+# Shuffled labels held in memory at a time (permutations x patients)
+BLOCK_CELLS = 4_000_000
+
+RESULT_COLUMNS = ['Dimension', 'Groups', 'Patients', 'Chi2', 'DoF', 'Chi2_p', 'Fisher_p', 'Permutation_p']
+
+
+def chi2_sf(x, dof):
+    """Upper tail probability of the chi-square distribution with an integer number of degrees of freedom"""
+    if dof < 1 or not x > 0:
+        return 1.0
+    half = x / 2
+    if dof % 2 == 0:
+        # exp(-x/2) * sum of (x/2)^i / i! for i < dof/2
+        term, total = 1.0, 1.0
+        for i in range(1, dof // 2):
+            term *= half / i
+            total += term
+        return min(1.0, math.exp(-half) * total)
+    root = math.sqrt(x)
+    term, total = root * math.sqrt(2 / math.pi), 0.0
+    for i in range(1, (dof + 1) // 2):
+        total += term
+        term *= x / (2 * i + 1)
+    return min(1.0, math.erfc(root / math.sqrt(2)) + math.exp(-half) * total)
+
+
+def fisher_exact(a, b, c, d):
+    """Two-sided p-value of Fisher's exact test for the 2x2 table [[a, b], [c, d]]"""
+    row1, col1, n = a + b, a + c, a + b + c + d
+    support = np.arange(max(0, row1 + col1 - n), min(row1, col1) + 1)
+
+    def log_pmf(k):
+        return (_log_choose(col1, k) + _log_choose(n - col1, row1 - k) - _log_choose(n, row1))
+
+    logs = np.array([log_pmf(k) for k in support])
+    observed = log_pmf(a)
+    # Tables no more likely than the observed one (with a little slack for rounding)
+    return float(min(1.0, np.exp(logs[logs <= observed + 1e-7]).sum()))
+
+
+def _log_choose(n, k):
+    return math.lgamma(n + 1) - math.lgamma(k + 1) - math.lgamma(n - k + 1)
+
+
+def _chi2_statistic(successes, n):
+    """Pearson chi-square of groups x success/failure from success counts (..., groups) and group sizes"""
+    total = n.sum()
+    rate = successes.sum(axis=-1, keepdims=True) / total
+    with np.errstate(divide='ignore', invalid='ignore'):
+        statistic = ((successes - n * rate) ** 2 / (n * rate * (1 - rate))).sum(axis=-1)
+    # Everybody succeeded (or failed): no evidence of a difference
+    return np.where((rate[..., 0] > 0) & (rate[..., 0] < 1), statistic, 0.0)
+
+
+def _indicators(df, dimensions):
+    """Stacked 0/1 group indicator columns of all the dimensions, and each dimension's column slice and labels"""
+    blocks, slices, start = [], {}, 0
+    for dim in dimensions:
+        values = df[dim]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            codes, labels = values.cat.codes.to_numpy(), values.cat.categories
+        else:
+            codes, labels = pd.factorize(values)
+        # Groups without patients are left out of the tests
+        present = np.bincount(codes[codes >= 0], minlength=len(labels)) > 0
+        remap = np.cumsum(present) - 1
+        codes = np.where(codes >= 0, remap[np.maximum(codes, 0)], -1)
+        groups = int(present.sum())
+        block = np.zeros((len(df), groups), dtype=np.float32)
+        rows = np.flatnonzero(codes >= 0)
+        block[rows, codes[rows]] = 1
+        blocks.append(block)
+        slices[dim] = (slice(start, start + groups), [str(label) for label in np.asarray(labels)[present]])
+        start += groups
+    return np.hstack(blocks) if blocks else np.zeros((len(df), 0), dtype=np.float32), slices
+
+
+def permutation_counts(success, indicators, permutations=PERMUTATIONS, seed=PERMUTATION_SEED):
+    """
+    Yield group success counts (block of permutations x indicator columns) for shuffled success labels.
+
+    Each block shuffles the labels into one matrix and multiplies it with the
+    indicators of every dimension at once. Blocks are a fixed size with their
+    own seed, so the shuffles only depend on the seed.
+    """
+    block = max(1, BLOCK_CELLS // max(len(success), 1))
+    starts = range(0, permutations, block)
+    for start, block_seed in zip(starts, np.random.SeedSequence(seed).spawn(len(starts))):
+        rng = np.random.default_rng(block_seed)
+        size = min(block, permutations - start)
+        shuffled = rng.permuted(np.tile(success.astype(np.float32), (size, 1)), axis=1)
+        yield shuffled @ indicators
+
+
+def test_frame(df, dimensions, permutations=PERMUTATIONS, seed=PERMUTATION_SEED):
+    """Chi-square, Fisher and permutation tests of 1-month success for each dimension of an encoded cohort"""
+    unknown = [dim for dim in dimensions if dim not in df.columns]
+    if unknown:
+        raise KeyError(f"No column {unknown[0]!r} to test, expected one of {list(df.columns)}")
+    success = cohort.functional(df[SUCCESS_TIMEPOINT])
+    df, success = df[success.notna()], success.dropna().to_numpy()
+    indicators, slices = _indicators(df, dimensions)
+
+    n = indicators.sum(axis=0)
+    observed = success.astype(np.float32) @ indicators
+    statistics = {dim: _chi2_statistic(observed[cols].astype(float), n[cols].astype(float))
+                  for dim, (cols, _) in slices.items()}
+    extreme = dict.fromkeys(dimensions, 0)
+    for counts in permutation_counts(success, indicators, permutations, seed):
+        for dim, (cols, _) in slices.items():
+            shuffled = _chi2_statistic(counts[:, cols].astype(float), n[cols].astype(float))
+            extreme[dim] += int((shuffled >= statistics[dim] - 1e-9).sum())
+
+    rows = []
+    for dim, (cols, labels) in slices.items():
+        groups, dof = len(labels), len(labels) - 1
+        fisher = np.nan
+        if groups == 2:
+            (s1, s2), (n1, n2) = observed[cols].round().astype(int), n[cols].round().astype(int)
+            fisher = fisher_exact(s1, n1 - s1, s2, n2 - s2)
+        rows.append({
+            'Dimension': dim,
+            'Groups': groups,
+            'Patients': int(n[cols].sum()),
+            'Chi2': round(float(statistics[dim]), 3),
+            'DoF': dof,
+            'Chi2_p': chi2_sf(float(statistics[dim]), dof),
+            'Fisher_p': fisher,
+            # The observed labelling counts as one of the permutations
+            'Permutation_p': (extreme[dim] + 1) / (permutations + 1),
+        })
+    return pd.DataFrame(rows, columns=RESULT_COLUMNS)
+
+
+def results_path(path, fingerprint):
+    """Test results kept next to the CSV, e.g. operated_eye_va_data.tests-<hash>.json"""
+    root, _ = os.path.splitext(path)
+    return f'{root}.tests-{fingerprint}.json'
+
+
+def _entry_key(dim, permutations, seed):
+    return f'{dim}|{permutations}|{seed}'
+
+
+def test_csv(path, dimensions, permutations=PERMUTATIONS, seed=PERMUTATION_SEED, cache=True, load=None):
+    """
+    test_frame() for a surgery CSV, with the results cached by the CSV's content hash.
+
+    Only the dimensions without a cached result for these settings are
+    computed (together, in one batch); editing the CSV discards the cache.
+    load returns the encoded cohort of path when something has to be
+    computed (default: cohort.load_cohort), e.g. one a caller already holds.
+    """
+    if not cache:
+        df = load() if load else cohort.load_cohort(path, cache=False)
+        return test_frame(df, dimensions, permutations, seed)
+
+    cached = results_path(path, file_fingerprint(path))
+    entries = {}
+    if os.path.exists(cached):
+        with open(cached) as f:
+            entries = json.load(f)
+    else:
+        # Drop results computed from older versions of the CSV
+        root, _ = os.path.splitext(path)
+        for stale in glob.glob(f'{glob.escape(root)}.tests-*.json'):
+            os.remove(stale)
+
+    missing = [dim for dim in dimensions if _entry_key(dim, permutations, seed) not in entries]
+    if missing:
+        results = test_frame(load() if load else cohort.load_cohort(path), missing, permutations, seed)
+        for row in results.to_dict('records'):
+            entries[_entry_key(row['Dimension'], permutations, seed)] = row
+        tmp = cached + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(entries, f, indent=2)
+        os.replace(tmp, cached)
+
+    return pd.DataFrame([entries[_entry_key(dim, permutations, seed)] for dim in dimensions], columns=RESULT_COLUMNS)
+
+
+def format_p(p, digits=3):
+    """'p = 0.042', or 'p < 0.001' below the displayed precision"""
+    floor = 10 ** -digits
+    return f"p < {floor:.{digits}f}" if p < floor else f"p = {p:.{digits}f}"
+
+
+def print_results(results, alpha=0.05):
+    """One line per dimension: the p-values and whether success differs between its groups (permutation test)"""
+    for row in results.itertuples(index=False):
+        fisher = '' if pd.isna(row.Fisher_p) else f", Fisher {format_p(row.Fisher_p)}"
+        verdict = 'differs between groups' if row.Permutation_p < alpha else 'no significant difference'
+        print(f"  {row.Dimension.strip()}: {row.Groups} groups, {row.Patients} patients, "
+              f"chi2 = {row.Chi2:.2f} (df {row.DoF}, {format_p(row.Chi2_p)}){fisher}, "
+              f"permutation {format_p(row.Permutation_p, 4)} - by the permutation test, {verdict} at {alpha:g}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Test whether 1-month success differs between groups')
+    parser.add_argument('data_file', nargs='?', default='operated_eye_va_data.csv', help='surgery CSV')
+    parser.add_argument('--by', action='append', help='dimension (cohort column) to test; repeat for several '
+                        '(default: SEX, Age_Group, location, procedure)')
+    parser.add_argument('--permutations', type=int, default=PERMUTATIONS, help='label shuffles per test')
+    parser.add_argument('--seed', type=int, default=PERMUTATION_SEED, help='seed of the shuffles')
+    parser.add_argument('--no-cache', action='store_true', help='recompute instead of using cached results')
+    args = parser.parse_args()
+
+    dimensions = args.by
+    if not dimensions:
+        columns = pd.read_csv(args.data_file, nrows=0).columns
+        dimensions = ['SEX', 'Age_Group', cohort.location_column(pd.DataFrame(columns=columns)),
+                      cohort.PROCEDURE_COLUMN]
+
+    results = test_csv(args.data_file, dimensions, args.permutations, args.seed, cache=not args.no_cache)
+    print(f"Success at 1 month by group in {args.data_file} ({args.permutations} permutations):")
+    print_results(results)
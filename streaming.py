@@ -0,0 +1,189 @@
+import numpy as np
+import pandas as pd
+
+import cohort
+import transitions
+import va_codec
+
+N_LEVELS = len(va_codec.FINE_SCALE)
+
+# Default number of registry rows held in memory at a time in streaming mode
+DEFAULT_CHUNKSIZE = 100_000
+
+
+def _columns(dim):
+    """Columns of a dimension - a column name, or a tuple of them for a cross-product"""
+    return dim if isinstance(dim, tuple) else (dim,)
+
+
+def _sort_key(columns, label):
+    """Sort labels alphabetically, except age groups which keep their natural order"""
+    labels = label if isinstance(label, tuple) else (label,)
+    return tuple((cohort.AGE_GROUPS.index(value), '') if col == 'Age_Group' else (0, value)
+                 for col, value in zip(columns, labels))
+
+
+class OutcomeAggregate:
+    """
+    Mergeable partial aggregates of surgical outcomes.
+
+    Chunks of the encoded cohort are folded in with update(), and aggregates
+    built over disjoint rows combine with merge(). The impact tables are all
+    derived from these totals, so patient rows never need to be kept around:
+    - per-dimension row counts, 1-month success counts and success sums
+      (a dimension is a column, or a tuple of columns for a cross-product)
+    - a fine-scale VA histogram for each timepoint
+    - pre-op -> 1-month VA transition counts
+    - age sum/count for the mean age
+    """
+
+    def __init__(self, dimensions):
+        self.dimensions = list(dimensions)
+        self.rows = 0
+        self.age_sum = 0.0
+        self.age_count = 0
+        self.va_histograms = {col: np.zeros(N_LEVELS, dtype=np.int64) for col in cohort.VA_COLUMNS}
+        self.transitions = np.zeros((N_LEVELS, N_LEVELS), dtype=np.int64)
+        self.groups = {dim: pd.DataFrame(columns=['Rows', 'Total_Patients', 'Success_Count'], dtype=float)
+                       for dim in self.dimensions}
+
+    def update(self, chunk):
+        """Fold one chunk of the encoded cohort into the totals"""
+        self.rows += len(chunk)
+
+        if 'AGE' in chunk.columns:
+            age = chunk['AGE'].dropna().to_numpy(dtype=np.float64)
+            self.age_sum += age.sum()
+            self.age_count += len(age)
+
+        for col in cohort.VA_COLUMNS:
+            if col in chunk.columns:
+                codes = chunk[col].cat.codes.to_numpy()
+                self.va_histograms[col] += np.bincount(codes[codes >= 0], minlength=N_LEVELS)
+
+        if 'PRE_OP_VA' in chunk.columns and '1_MONTH_POST_OP_VA' in chunk.columns:
+            self.transitions += transitions.transition_counts(chunk['PRE_OP_VA'].cat.codes.to_numpy(),
+                                                              chunk['1_MONTH_POST_OP_VA'].cat.codes.to_numpy(),
+                                                              N_LEVELS)[0]
+
+        self._update_groups(chunk, cohort.functional(chunk['1_MONTH_POST_OP_VA']))
+
+    def _update_groups(self, chunk, success):
+        """
+        Row counts and success sums for every dimension from a single pass over the chunk.
+
+        The integer codes of all the grouping columns are packed into one key
+        per row (a missing value takes digit 0), and the rows are counted per
+        occupied key with bincount. Each dimension or cross-product is then a
+        roll-up of those few occupied cells, so adding breakdowns does not add
+        passes over the rows.
+        """
+        columns = [col for col in dict.fromkeys(c for dim in self.dimensions for c in _columns(dim))
+                   if col in chunk.columns]
+        if not columns:
+            return
+
+        codes, labels = {}, {}
+        for col in columns:
+            values = chunk[col]
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                codes[col], categories = values.cat.codes.to_numpy(), values.cat.categories
+            else:
+                codes[col], categories = pd.factorize(values)
+            # Digit 0 is the missing value, so it maps to None
+            labels[col] = np.array([None] + [str(c) for c in categories], dtype=object)
+        cohort.check_key_space({col: len(labels[col]) for col in columns})
+
+        key = np.zeros(len(chunk), dtype=np.int64)
+        for col in columns:
+            key = key * len(labels[col]) + (codes[col].astype(np.int64) + 1)
+
+        cells, keys = pd.factorize(key)
+        valid = success.notna().to_numpy()
+        n_cells = len(keys)
+        totals = pd.DataFrame({
+            'Rows': np.bincount(cells, minlength=n_cells),
+            'Total_Patients': np.bincount(cells, weights=valid, minlength=n_cells),
+            'Success_Count': np.bincount(cells, weights=np.where(valid, success.to_numpy(), 0.0), minlength=n_cells),
+        })
+
+        # Unpack each occupied cell's key back into its labels
+        keys = np.asarray(keys)
+        for col in reversed(columns):
+            keys, digit = np.divmod(keys, len(labels[col]))
+            totals[col] = labels[col][digit]
+
+        for dim in self.dimensions:
+            dim_columns = list(_columns(dim))
+            if not set(dim_columns) <= set(columns):
+                continue
+            part = (totals.dropna(subset=dim_columns)
+                    .groupby(dim_columns if isinstance(dim, tuple) else dim)
+                    [['Rows', 'Total_Patients', 'Success_Count']].sum())
+            self.groups[dim] = part if self.groups[dim].empty else self.groups[dim].add(part, fill_value=0)
+
+    def merge(self, other):
+        """Combine with an aggregate built over different rows"""
+        self.rows += other.rows
+        self.age_sum += other.age_sum
+        self.age_count += other.age_count
+        for col in self.va_histograms:
+            self.va_histograms[col] += other.va_histograms[col]
+        self.transitions += other.transitions
+        for dim in self.dimensions:
+            theirs = other.groups.get(dim)
+            if theirs is None or theirs.empty:
+                continue
+            ours = self.groups[dim]
+            self.groups[dim] = theirs.copy() if ours.empty else ours.add(theirs, fill_value=0)
+        return self
+
+    def success_table(self, dim):
+        """Total_Patients and Success_Count per group, in the order groupby would give"""
+        columns = _columns(dim)
+        table = self.groups[dim]
+        table = table.reindex(sorted(table.index, key=lambda label: _sort_key(columns, label)))
+        labels = list(zip(*table.index)) if isinstance(dim, tuple) else [table.index]
+        frame = pd.DataFrame({col: list(values) for col, values in zip(columns, labels)})
+        frame['Total_Patients'] = table['Total_Patients'].astype(int).to_numpy()
+        frame['Success_Count'] = table['Success_Count'].astype(float).to_numpy()
+        return frame
+
+    def success_tables(self):
+        """success_table() for every dimension, keyed by dimension"""
+        return {dim: self.success_table(dim) for dim in self.dimensions}
+
+    def group_counts(self, dim):
+        """Number of rows per group, largest first (like value_counts)"""
+        return self.groups[dim]['Rows'].astype(int).sort_values(ascending=False, kind='stable')
+
+    def functional_rate(self, col):
+        """Fraction of recorded VA readings at this timepoint that are 6/18 or better"""
+        hist = self.va_histograms[col]
+        return hist[cohort.FUNCTIONAL_CODE:].sum() / hist.sum()
+
+    def vision_category_distribution(self, col):
+        """Percentage of recorded VA readings in each WHO vision category"""
+        hist = self.va_histograms[col]
+        edges = np.ceil(cohort.VISION_CATEGORY_BINS).astype(int)
+        counts = pd.Series([hist[lo:hi].sum() for lo, hi in zip(edges[:-1], edges[1:])],
+                           index=cohort.VISION_CATEGORIES)
+        return counts / counts.sum() * 100
+
+    def mean_age(self):
+        return self.age_sum / self.age_count if self.age_count else np.nan
+
+
+def aggregate_frame(df, dimensions):
+    """Aggregate an already encoded cohort frame in one go"""
+    outcomes = OutcomeAggregate(dimensions)
+    outcomes.update(df)
+    return outcomes
+
+
+def aggregate_csv(path, dimensions, chunksize=DEFAULT_CHUNKSIZE):
+    """Stream a registry CSV in chunks, keeping only the running aggregates in memory"""
+    outcomes = OutcomeAggregate(dimensions)
+    for chunk in pd.read_csv(path, chunksize=chunksize):
+        outcomes.update(cohort.encode_cohort(chunk))
+    return outcomes
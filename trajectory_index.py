@@ -0,0 +1,198 @@
+"""
+Index of the eyes' VA trajectories over the four timepoints.
+
+Each eye's encoded VA at the timepoints is packed into one integer key, one
+base-(levels + 1) digit per timepoint with 0 for a missing reading:
+
+    key = sum of (code_t + 1) * base**(T - 1 - t)
+
+The index keeps the keys sorted with the row position of each, so all eyes
+sharing the first k digits - any trajectory that starts a given way - are one
+contiguous slice. A query such as HM -> CF -> * -> 6/9 is expanded into the
+prefixes it allows (up to its last fixed timepoint) and answered with one
+vectorised searchsorted over their ranges; a count never touches the rows.
+
+Usage:
+    python trajectory_index.py new/operated_eye_va_data.csv --scale coarse --match HM CF 6/24 6/9
+    python trajectory_index.py new/operated_eye_va_data.csv --regressed 2_WEEKS_POST_OP_VA 1_MONTH_POST_OP_VA
+    python trajectory_index.py new/operated_eye_va_data.csv --match 'PL|HM' '*' '*' '6/6|6/5' --rows
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+import transitions
+import va_codec
+
+# Pattern tokens: any value (recorded or not), and no reading
+ANY = '*'
+MISSING = '-'
+
+
+class TrajectoryIndex:
+    """Sorted packed trajectory keys of a surgery frame, with the row position of each key"""
+
+    def __init__(self, df, timepoints=transitions.TIMEPOINTS, scale='fine'):
+        self.timepoints = list(timepoints)
+        self.scale = scale
+        self.labels = va_codec.labels(scale)
+        self.base = len(self.labels) + 1
+        self.index = df.index
+
+        # Off-scale spellings count as missing, like everywhere else the VA is encoded
+        digits = np.maximum(transitions.timepoint_codes(df, timepoints, scale).astype(np.int64) + 1, 0)
+        keys = np.zeros(len(df), dtype=np.int64)
+        for t in range(len(self.timepoints)):
+            keys = keys * self.base + digits[:, t]
+        self.order = np.argsort(keys, kind='stable')
+        self.keys = keys[self.order]
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _position(self, timepoint):
+        """Index of a timepoint given by name or position"""
+        if isinstance(timepoint, int) and 0 <= timepoint < len(self.timepoints):
+            return timepoint
+        if timepoint in self.timepoints:
+            return self.timepoints.index(timepoint)
+        raise ValueError(f"Unknown timepoint {timepoint!r}, expected one of {', '.join(self.timepoints)}")
+
+    def _digits(self, token):
+        """Allowed digits of one pattern token: a label, 'A|B' alternatives, ANY or MISSING"""
+        if token is None or token == ANY:
+            return np.arange(self.base)
+        digits = []
+        for part in ([token] if not isinstance(token, str) else token.split('|')):
+            if part == MISSING:
+                digits.append(0)
+            elif part in self.labels:
+                digits.append(self.labels.index(part) + 1)
+            else:
+                raise ValueError(f"{part!r} is not on the {self.scale} VA scale ({', '.join(self.labels)})")
+        return np.array(sorted(set(digits)))
+
+    def _ranges(self, prefixes, depth):
+        """Start and end offsets into the sorted keys of every prefix over the first depth timepoints"""
+        width = self.base ** (len(self.timepoints) - depth)
+        prefixes = np.unique(prefixes)
+        lo = np.searchsorted(self.keys, prefixes * width, side='left')
+        hi = np.searchsorted(self.keys, (prefixes + 1) * width, side='left')
+        return lo, hi
+
+    def where(self, predicate, depth):
+        """
+        Offset ranges of the eyes whose first depth timepoints satisfy predicate.
+
+        predicate gets an array of candidate codes (candidates x depth, -1 for
+        missing) and returns which of them to keep; the later timepoints are
+        free, so each kept candidate is one contiguous range of keys.
+        """
+        grids = np.meshgrid(*[np.arange(self.base)] * depth, indexing='ij')
+        candidates = np.column_stack([g.ravel() for g in grids]) if depth else np.zeros((1, 0), dtype=np.int64)
+        candidates = candidates[predicate(candidates - 1)]
+        prefixes = np.zeros(len(candidates), dtype=np.int64)
+        for t in range(depth):
+            prefixes = prefixes * self.base + candidates[:, t]
+        return self._ranges(prefixes, depth)
+
+    def match(self, *pattern):
+        """
+        Offset ranges of the eyes matching a trajectory pattern.
+
+        One token per timepoint (missing trailing tokens are ANY), e.g.
+        match('HM', 'CF', ANY, '6/9') or match('PL|HM', ANY, ANY, '6/6').
+        """
+        if len(pattern) > len(self.timepoints):
+            raise ValueError(f"Pattern has {len(pattern)} tokens but the index has {len(self.timepoints)} timepoints "
+                             f"({', '.join(self.timepoints)})")
+        allowed = [self._digits(token) for token in pattern]
+        # Trailing wildcards do not narrow the ranges
+        while allowed and len(allowed[-1]) == self.base:
+            allowed.pop()
+        prefixes = np.zeros(1, dtype=np.int64)
+        for digits in allowed:
+            prefixes = np.add.outer(prefixes * self.base, digits).ravel()
+        return self._ranges(prefixes, len(allowed))
+
+    def changed(self, start, end, direction):
+        """Offset ranges of the eyes recorded at both timepoints whose VA got worse (-1), stayed (0) or improved (+1)"""
+        start, end = self._position(start), self._position(end)
+
+        def predicate(codes):
+            before, after = codes[:, start], codes[:, end]
+            return (before >= 0) & (after >= 0) & (np.sign(after - before) == direction)
+        return self.where(predicate, max(start, end) + 1)
+
+    def regressed(self, start, end):
+        return self.changed(start, end, -1)
+
+    def improved(self, start, end):
+        return self.changed(start, end, 1)
+
+    @staticmethod
+    def count(ranges):
+        """Number of eyes in offset ranges"""
+        lo, hi = ranges
+        return int((hi - lo).sum())
+
+    @staticmethod
+    def _offsets(ranges):
+        # Expand every range into its offsets without a Python loop
+        lo, hi = ranges
+        lengths = hi - lo
+        return np.repeat(lo - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+
+    def rows(self, ranges):
+        """Index labels of the eyes in offset ranges, in frame order"""
+        return self.index[np.sort(self.order[self._offsets(ranges)])]
+
+    def trajectories(self, ranges=None):
+        """Eyes per distinct trajectory (in the given ranges, or all), most common first"""
+        keys = self.keys if ranges is None else self.keys[self._offsets(ranges)]
+        unique, eyes = np.unique(keys, return_counts=True)
+        table = np.array(self.labels + [MISSING], dtype=object)
+        columns = {}
+        for tp in reversed(self.timepoints):
+            unique, digit = np.divmod(unique, self.base)
+            # Digit 0 (missing) picks up the trailing MISSING entry
+            columns[tp] = table[digit - 1]
+        frame = pd.DataFrame({tp: columns[tp] for tp in self.timepoints})
+        frame['Eyes'] = eyes
+        return frame.sort_values('Eyes', ascending=False, kind='stable').reset_index(drop=True)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Query the VA trajectories of the eyes across the timepoints')
+    parser.add_argument('data_file', nargs='?', default='operated_eye_va_data.csv', help='surgery CSV')
+    parser.add_argument('--scale', choices=list(va_codec.SCALES), default='fine', help='VA scale')
+    query = parser.add_mutually_exclusive_group()
+    query.add_argument('--match', nargs='+', metavar='VA',
+                       help=f"trajectory pattern, one token per timepoint: a VA label, 'A|B', "
+                            f"'{ANY}' (anything) or '{MISSING}' (not recorded)")
+    query.add_argument('--regressed', nargs=2, metavar=('FROM', 'TO'), help='eyes whose VA got worse between two timepoints')
+    query.add_argument('--improved', nargs=2, metavar=('FROM', 'TO'), help='eyes whose VA improved between two timepoints')
+    parser.add_argument('--rows', action='store_true', help='print the matching rows')
+    parser.add_argument('--top', type=int, default=10, help='most common matching trajectories listed')
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.data_file)
+    index = TrajectoryIndex(df, scale=args.scale)
+    try:
+        if args.match:
+            ranges, query = index.match(*args.match), ' -> '.join(args.match)
+        elif args.regressed:
+            ranges, query = index.regressed(*args.regressed), 'regressed from {} to {}'.format(*args.regressed)
+        elif args.improved:
+            ranges, query = index.improved(*args.improved), 'improved from {} to {}'.format(*args.improved)
+        else:
+            ranges, query = None, 'all eyes'
+    except ValueError as error:
+        parser.error(str(error))
+
+    matched = len(index) if ranges is None else index.count(ranges)
+    print(f"{query}: {matched} of {len(index)} eyes")
+    print(index.trajectories(ranges).head(args.top).to_string(index=False))
+    if args.rows and ranges is not None:
+        print(df.loc[index.rows(ranges)].to_string())
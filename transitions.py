@@ -0,0 +1,190 @@
+"""
+VA transitions between the follow-up timepoints.
+
+For every pair of timepoints (pre-op -> 1 day, pre-op -> 1 month, 2 weeks ->
+1 month, ...) the eyes are counted by (VA at the first, VA at the second) on
+the fine or coarse scale. Each pair is one bincount over the packed integer
+key group * levels**2 + from * levels + to, so a breakdown by location or
+procedure costs the same single pass as the whole cohort.
+
+The consecutive steps (pre-op -> 1 day -> 2 weeks -> 1 month) also give the
+transition probabilities of a Markov chain: chaining them from the pre-op
+distribution projects the distribution at each later timepoint, which can be
+compared with what was observed.
+
+Usage:
+    python transitions.py new/operated_eye_va_data.csv
+    python transitions.py operated_eye_va_data.csv --scale coarse --by 'PATIENTS PHYSICAL ADDRSS '
+"""
+import argparse
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+
+import cohort
+import va_codec
+
+TIMEPOINTS = cohort.VA_COLUMNS
+
+
+def timepoint_codes(df, timepoints=TIMEPOINTS, scale='fine'):
+    """(rows, timepoints) array of VA codes on the scale, from raw VA strings or an encoded cohort"""
+    codes = np.empty((len(df), len(timepoints)), dtype=np.int8)
+    for i, col in enumerate(timepoints):
+        values = df[col]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            # Encoded cohort columns are categoricals on the fine scale, so their codes are the VA codes
+            fine = values.cat.codes.to_numpy()
+            codes[:, i] = va_codec.fine_to_coarse(fine) if scale == 'coarse' else fine
+        else:
+            codes[:, i] = va_codec.encode(values, scale)
+    return codes
+
+
+def transition_counts(from_codes, to_codes, levels, groups=None, n_groups=1):
+    """
+    Counts of each (from, to) code pair, as an array of shape (n_groups, levels, levels).
+
+    One bincount over the packed keys; rows with a missing or off-scale code
+    at either timepoint (or a missing group) are left out.
+    """
+    from_codes = np.asarray(from_codes, dtype=np.int64)
+    to_codes = np.asarray(to_codes, dtype=np.int64)
+    valid = (from_codes >= 0) & (to_codes >= 0)
+    key = from_codes * levels + to_codes
+    if groups is not None:
+        groups = np.asarray(groups, dtype=np.int64)
+        valid &= groups >= 0
+        key = key + groups * levels * levels
+    return np.bincount(key[valid], minlength=n_groups * levels * levels).reshape(n_groups, levels, levels)
+
+
+def _normalise_rows(matrix):
+    totals = matrix.sum(axis=-1, keepdims=True)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(totals > 0, matrix / totals, 0.0)
+
+
+class Transitions:
+    """
+    Transition counts between every pair of timepoints, overall and per group.
+
+    counts[(start, end)] has shape (groups + 1, levels, levels): index 0 is
+    the whole cohort, index i + 1 the i-th group (see group_labels).
+    """
+
+    def __init__(self, counts, histograms, timepoints, scale, group_labels=()):
+        self.counts = counts
+        self.histograms = histograms
+        self.timepoints = list(timepoints)
+        self.scale = scale
+        self.labels = va_codec.labels(scale)
+        self.group_labels = list(group_labels)
+
+    def _index(self, group):
+        return 0 if group is None else self.group_labels.index(group) + 1
+
+    def matrix(self, start, end, group=None, normalize=False):
+        """Counts (or % of each starting row, with normalize) from start VA (rows) to end VA (columns)"""
+        matrix = self.counts[(start, end)][self._index(group)]
+        if normalize:
+            matrix = _normalise_rows(matrix) * 100
+        return pd.DataFrame(matrix, index=pd.Index(self.labels, name=start),
+                            columns=pd.Index(self.labels, name=end))
+
+    def summary(self, group=None):
+        """Per pair of timepoints: eyes seen at both, % improved / unchanged / worse and mean lines gained"""
+        levels = np.arange(len(self.labels))
+        change = levels[None, :] - levels[:, None]
+        rows = []
+        for (start, end), counts in self.counts.items():
+            matrix = counts[self._index(group)]
+            eyes = matrix.sum()
+            share = (lambda mask: matrix[mask].sum() / eyes * 100) if eyes else (lambda mask: np.nan)
+            rows.append({
+                'From': start,
+                'To': end,
+                'Eyes': int(eyes),
+                'Improved (%)': share(change > 0),
+                'Unchanged (%)': share(change == 0),
+                'Worse (%)': share(change < 0),
+                'Mean_Change (lines)': (matrix * change).sum() / eyes if eyes else np.nan,
+            })
+        return pd.DataFrame(rows).round(1)
+
+    def step_probabilities(self, group=None):
+        """Row-stochastic transition matrices of the consecutive steps, keyed by (start, end)"""
+        steps = zip(self.timepoints[:-1], self.timepoints[1:])
+        return {step: _normalise_rows(self.counts[step][self._index(group)].astype(float)) for step in steps}
+
+    def distributions(self, group=None):
+        """Observed VA distribution (%) at each timepoint, and the Markov projection from the first one"""
+        index = self._index(group)
+        observed = np.array([_normalise_rows(self.histograms[tp][index].astype(float)) for tp in self.timepoints])
+
+        projected = [observed[0]]
+        for probabilities in self.step_probabilities(group).values():
+            state = projected[-1]
+            # Levels no eye started a step from keep their share
+            stays = probabilities.sum(axis=1) == 0
+            projected.append(state @ probabilities + np.where(stays, state, 0.0))
+
+        def frame(rows):
+            return pd.DataFrame(np.array(rows) * 100, index=self.timepoints, columns=self.labels)
+        return frame(observed), frame(projected)
+
+
+def transitions(df, timepoints=TIMEPOINTS, scale='fine', by=None):
+    """Transitions between every pair of the timepoints of a surgery frame, optionally per group of column by"""
+    codes = timepoint_codes(df, timepoints, scale)
+    levels = len(va_codec.labels(scale))
+
+    groups, group_labels = None, []
+    if by is not None:
+        values = df[by]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            groups, group_labels = values.cat.codes.to_numpy(), list(values.cat.categories)
+        else:
+            groups, group_labels = pd.factorize(values)
+            group_labels = list(group_labels)
+
+    def stacked(from_codes, to_codes):
+        # The whole cohort first, then one block per group
+        overall = transition_counts(from_codes, to_codes, levels)
+        if groups is None:
+            return overall
+        return np.concatenate([overall, transition_counts(from_codes, to_codes, levels, groups, len(group_labels))])
+
+    counts = {(timepoints[i], timepoints[j]): stacked(codes[:, i], codes[:, j])
+              for i, j in combinations(range(len(timepoints)), 2)}
+    # A timepoint's histogram is the diagonal of its transitions to itself
+    histograms = {tp: np.diagonal(stacked(codes[:, i], codes[:, i]), axis1=1, axis2=2)
+                  for i, tp in enumerate(timepoints)}
+    return Transitions(counts, histograms, timepoints, scale, group_labels)
+
+
+def print_transitions(result, group=None):
+    title = 'All eyes' if group is None else group
+    print(f"\n{title}:")
+    print(result.summary(group).to_string(index=False))
+
+    # Functional vision (6/18 or better) at each timepoint, observed and chained through the steps
+    observed, projected = result.distributions(group)
+    functional = result.labels.index('6/18')
+    print("  Functional vision (%): " + ', '.join(
+        f"{tp} {observed.iloc[i, functional:].sum():.1f} (Markov {projected.iloc[i, functional:].sum():.1f})"
+        for i, tp in enumerate(result.timepoints)))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Summarise the VA transitions between the follow-up timepoints')
+    parser.add_argument('data_file', nargs='?', default='operated_eye_va_data.csv', help='surgery CSV')
+    parser.add_argument('--scale', choices=list(va_codec.SCALES), default='fine', help='VA scale')
+    parser.add_argument('--by', help='also summarise each group of this column (e.g. a location or procedure)')
+    args = parser.parse_args()
+
+    result = transitions(pd.read_csv(args.data_file), scale=args.scale, by=args.by)
+    print_transitions(result)
+    for group in result.group_labels:
+        print_transitions(result, group)
@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+
+# Visual acuity scales, ordered from worst to best vision.
+# The position of a label in its scale is its code, so a higher code means
+# better vision (the same numbering the old va_to_numeric functions used).
+FINE_SCALE = ('NPL', 'PL', 'HM', 'CFN', 'CF1M', 'CF2M', 'CF3M', 'CF4M', 'CF5M', 'CF6M',
+              '6/60', '6/36', '6/24', '6/18', '6/12', '6/9', '6/6', '6/5')
+
+# Coarse scale used by the journey charts - every counting fingers reading collapses to CF
+COARSE_SCALE = ('NPL', 'PL', 'HM', 'CF', '6/60', '6/36', '6/24', '6/18', '6/12', '6/9', '6/6')
+
+SCALES = {'fine': FINE_SCALE, 'coarse': COARSE_SCALE}
+
+# Sentinel codes for cells that are not on the scale
+MISSING = -1        # NaN or empty string
+UNRECOGNISED = -2   # a spelling that is not one of the scale labels
+
+
+def labels(scale='fine'):
+    """Return the scale labels (worst to best), e.g. for chart axis ticks"""
+    return list(SCALES[scale])
+
+
+def code(label, scale='fine'):
+    """Return the integer code of a single VA label"""
+    return SCALES[scale].index(label)
+
+
+def _lookup(value, scale):
+    if value == '':
+        return MISSING
+    if scale == 'coarse' and value.startswith('CF'):
+        return COARSE_SCALE.index('CF')
+    try:
+        return SCALES[scale].index(value)
+    except ValueError:
+        return UNRECOGNISED
+
+
+def encode(values, scale='fine'):
+    """
+    Encode a column of VA strings into an int8 code array.
+
+    Only the distinct spellings are looked up; the per-row work is a single
+    factorize plus one array take, so the cost barely depends on row count.
+    Missing cells get MISSING and spellings off the scale get UNRECOGNISED.
+    """
+    codes, uniques = pd.factorize(np.asarray(values, dtype=object))
+    # The trailing MISSING entry is picked up by the -1 code factorize uses for NaN
+    lut = np.array([_lookup(str(u), scale) for u in uniques] + [MISSING], dtype=np.int8)
+    return lut[codes]
+
+
+def to_numeric(values, scale='fine'):
+    """Drop-in replacement for `series.apply(va_to_numeric)`: float codes with NaN when off the scale"""
+    codes = encode(values, scale)
+    numeric = np.where(codes >= 0, codes, np.nan)
+    if isinstance(values, pd.Series):
+        return pd.Series(numeric, index=values.index, name=values.name)
+    return numeric
+
+
+def decode(codes, scale='fine'):
+    """Map integer codes (or float medians) back to their labels; off-scale codes become None"""
+    table = np.array(SCALES[scale] + (None,), dtype=object)
+    codes = np.asarray(codes, dtype=float)
+    idx = np.where(np.isnan(codes) | (codes < 0) | (codes >= len(SCALES[scale])),
+                   len(SCALES[scale]), np.nan_to_num(codes))
+    return table[idx.astype(np.intp)]
+
+
+# Fine code -> coarse code (CFN..CF6M collapse to CF, 6/5 is off the coarse scale)
+FINE_TO_COARSE = encode(list(FINE_SCALE), 'coarse')
+
+
+def fine_to_coarse(codes):
+    """Convert fine-scale codes to coarse-scale codes, keeping the sentinel codes"""
+    codes = np.asarray(codes)
+    return np.where(codes >= 0, FINE_TO_COARSE[np.clip(codes, 0, None)], codes).astype(np.int8)
+
+
+def histogram(values, scale='fine'):
+    """Count the cells at each level of the scale as a Series indexed by label"""
+    codes = encode(values, scale)
+    counts = np.bincount(codes[codes >= 0], minlength=len(SCALES[scale]))
+    return pd.Series(counts, index=labels(scale))
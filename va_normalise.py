@@ -0,0 +1,135 @@
+"""
+Normalise free-text visual acuity spellings to the labels of va_codec.FINE_SCALE.
+
+Each distinct spelling is folded (whitespace removed, upper case) and run
+through an ordered list of compiled pattern rules; the first rule that
+recognises it gives the label. Only the distinct spellings of a column are
+looked at, and the results are broadcast back to the rows, so the cost grows
+with the number of spellings rather than the number of patients.
+
+Spellings no rule recognises are kept as they are and reported, instead of
+silently becoming NaN when the column is encoded.
+
+Usage:
+    python va_normalise.py new/operated_eye_va_data.csv   # report how each VA spelling would be normalised
+"""
+import argparse
+import math
+import re
+
+import numpy as np
+import pandas as pd
+
+import va_codec
+
+# Returned by a rule for spellings that mean "not recorded" (Q: the patient did not come back)
+MISSING = np.nan
+
+_WHITESPACE = re.compile(r'\s+')
+
+# Snellen lines on the scale, as logMAR (log10 of the minimum angle of resolution)
+_SNELLEN_LINES = [(label, math.log10(int(label.split('/')[1]) / 6))
+                  for label in va_codec.FINE_SCALE if '/' in label]
+
+# A fraction or decimal reading maps to the nearest line within half a line (0.05 logMAR)
+LOGMAR_TOLERANCE = 0.05
+
+
+def _nearest_line(decimal):
+    if not decimal > 0:
+        return None
+    logmar = -math.log10(decimal)
+    label, line = min(_SNELLEN_LINES, key=lambda item: abs(item[1] - logmar))
+    return label if abs(line - logmar) <= LOGMAR_TOLERANCE else None
+
+
+def _fraction(match):
+    # An empty or mistyped numerator (C/36) is taken as the 6 m chart distance
+    numerator = float(match.group(1) or 6)
+    denominator = float(match.group(2))
+    return _nearest_line(numerator / denominator) if denominator else None
+
+
+def _counting_fingers(match):
+    # CF at "0 m" (CFOM, CF0M) is recorded as the nearest distance on the scale, CF1M
+    metres = 0 if match.group(1) == 'O' else int(match.group(1))
+    return f'CF{max(metres, 1)}M' if metres <= 6 else None
+
+
+# (name, pattern, label or function of the match) - tried in order on the folded spelling
+RULES = [
+    ('not recorded', re.compile(r'^(?:Q|-|\.|NA|N/A|NIL|NAN)?$'), MISSING),
+    ('counting fingers at a distance', re.compile(r'^6?C\.?F?\.?([0-9O])(?:M|N|MTRS?|METRES?)$'), _counting_fingers),
+    ('counting fingers near face', re.compile(r'^C\.?F?\.?N\.?F?$'), 'CFN'),
+    ('hand movements', re.compile(r'^(?:H\.?M\.?|HANDMOVEMENTS?)$'), 'HM'),
+    ('no perception of light', re.compile(r'^(?:NPL|NLP|NOPL)$'), 'NPL'),
+    ('perception of light', re.compile(r'^(?:P\.?L\.?|L\.?P\.?)\+?$|^PERCEPTIONOFLIGHT$'), 'PL'),
+    # 6/9, 6//9, C6/24, C/36, 20/40 ...
+    ('Snellen fraction', re.compile(r'^C?(\d+(?:\.\d+)?)?/+(\d+(?:\.\d+)?)$'), _fraction),
+    ('decimal acuity', re.compile(r'^(\d?\.\d+|1\.0*)$'), lambda match: _nearest_line(float(match.group(1)))),
+]
+
+_LABELS = set(va_codec.FINE_SCALE)
+
+
+def normalise_spelling(spelling):
+    """
+    Return (label, rule name) for one spelling.
+
+    The label is a FINE_SCALE label, MISSING (NaN) for "not recorded", or
+    None when no rule recognises the spelling.
+    """
+    folded = _WHITESPACE.sub('', str(spelling)).upper()
+    if folded in _LABELS:
+        return folded, 'label' if folded == spelling else 'whitespace and case'
+    for name, pattern, result in RULES:
+        match = pattern.match(folded)
+        if match:
+            return (result(match) if callable(result) else result), name
+    return None, None
+
+
+def normalise(values):
+    """
+    Normalise a column of VA spellings.
+
+    Returns the normalised Series and the unmapped spellings with their row
+    counts (a Series, largest first). Unmapped cells keep their spelling.
+    """
+    values = pd.Series(values)
+    codes, uniques = pd.factorize(values.to_numpy(dtype=object))
+    results = [normalise_spelling(u)[0] for u in uniques]
+    unmapped = np.array([label is None for label in results] + [False])
+    # The trailing entry is picked up by the -1 code factorize gives missing cells
+    lut = np.array([u if label is None else label for u, label in zip(uniques, results)] + [np.nan], dtype=object)
+    normalised = pd.Series(lut[codes], index=values.index, name=values.name)
+
+    counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+    unmapped_counts = pd.Series(counts[unmapped[:-1]], index=pd.Index(uniques[unmapped[:-1]], dtype=object),
+                                name='rows').sort_values(ascending=False)
+    return normalised, unmapped_counts
+
+
+def spelling_report(df, columns):
+    """Every distinct spelling in the columns with its row count, normalised label and the rule that matched"""
+    values = pd.concat([df[col] for col in columns if col in df.columns]).dropna()
+    counts = values.value_counts()
+    rows = [(spelling, count) + normalise_spelling(spelling) for spelling, count in counts.items()]
+    return pd.DataFrame(rows, columns=['Spelling', 'Rows', 'Label', 'Rule'])
+
+
+if __name__ == '__main__':
+    import cohort
+
+    parser = argparse.ArgumentParser(description='Report how the VA spellings of a dataset are normalised')
+    parser.add_argument('path', help='surgery CSV')
+    parser.add_argument('--all', action='store_true', help='also list the spellings that are already labels')
+    args = parser.parse_args()
+
+    report = spelling_report(pd.read_csv(args.path, dtype=str), cohort.VA_COLUMNS)
+    if not args.all:
+        report = report[report['Rule'] != 'label']
+
+    unmapped = report['Label'].isna() & (report['Rule'] != 'not recorded')
+    print(f"VA spellings in {args.path}: {len(report)} to normalise, {unmapped.sum()} unmapped")
+    print(report.to_string(index=False))